@@ -4,10 +4,13 @@ import asyncio
 
 os.environ.setdefault('GROUP_DEEP', '1')
 
-if len(sys.argv) > 1:
+if len(sys.argv) == 2:
     os.environ['INPUT_SRT'] = sys.argv[1]
 
 from src.translator import translate 
 
 if __name__ == '__main__':
-    asyncio.run(translate.translate_srt_file())
+    if len(sys.argv) > 2:
+        asyncio.run(translate.translate_srt_batch(sys.argv[1:]))
+    else:
+        asyncio.run(translate.translate_srt_file())
@@ -0,0 +1,145 @@
+import os
+import sys
+import time
+import random
+import sqlite3
+import hashlib
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.translator import cachedb
+
+# Sizes are whole files (cache + translation memory + indexes), built the
+# way the app writes them. Usage: bench_cache.py [rows] [lookups]
+
+_PAIRS = [('en', 'fr'), ('en', 'es'), ('en', 'de'), ('he', 'en'), ('en', 'iw')]
+_WORDS = "the of and to in is you that it he was for on are as with his they at be this from have or by".split()
+
+
+def _cue(i: int) -> str:
+    rng = random.Random(i)
+    return " ".join(rng.choice(_WORDS) for _ in range(rng.randint(4, 14))) + f" {i}"
+
+
+def _rows(n: int):
+    for i in range(n):
+        src, tgt = _PAIRS[i % len(_PAIRS)]
+        cleaned = _cue(i)
+        yield i, src, tgt, cleaned, cleaned.upper()
+
+
+def _connect(path: str):
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=WAL;')
+    conn.execute('PRAGMA synchronous=NORMAL;')
+    return conn
+
+
+def build_v1(path: str, n: int):
+    conn = _connect(path)
+    conn.execute(
+        'CREATE TABLE translations (src TEXT NOT NULL, tgt TEXT NOT NULL, hash TEXT NOT NULL, text TEXT NOT NULL,'
+        ' PRIMARY KEY (src, tgt, hash));'
+    )
+    with conn:
+        conn.executemany(
+            'INSERT OR REPLACE INTO translations(src, tgt, hash, text) VALUES (?, ?, ?, ?)',
+            ((s, t, hashlib.sha256(c.encode()).hexdigest(), v) for _, s, t, c, v in _rows(n)),
+        )
+    return conn
+
+
+def build_v2(path: str, n: int):
+    # translate reads its settings at import time.
+    os.environ['TRANSLATE_CACHE_PATH'] = path
+    from src.translator import translate
+
+    batch = []
+    for _, s, t, c, v in _rows(n):
+        batch.append((s, t, c, v))
+        if len(batch) >= 10000:
+            translate.disk_cache_set_many(batch)
+            batch = []
+    translate.disk_cache_set_many(batch)
+    return translate
+
+
+def _size(conn, path: str) -> int:
+    conn.execute('PRAGMA wal_checkpoint(TRUNCATE);')
+    return os.path.getsize(path)
+
+
+def _tables(conn) -> dict:
+    """Bytes per table, indexes included; empty when SQLite lacks dbstat."""
+    try:
+        rows = conn.execute(
+            'SELECT m.tbl_name, SUM(s.pgsize) FROM dbstat s JOIN sqlite_master m ON m.name = s.name GROUP BY m.tbl_name'
+        ).fetchall()
+    except sqlite3.OperationalError:
+        return {}
+    return dict(rows)
+
+
+def _lookups(n: int, count: int, seed: int):
+    rng = random.Random(seed)
+    out = []
+    for _ in range(count):
+        # Half hits, half misses.
+        i = rng.randrange(n) if rng.random() < 0.5 else n + rng.randrange(n)
+        src, tgt = _PAIRS[i % len(_PAIRS)]
+        out.append((src, tgt, _cue(i)))
+    return out
+
+
+def _time_lookups(fn, keys):
+    samples = []
+    for src, tgt, cleaned in keys:
+        t0 = time.perf_counter()
+        fn(src, tgt, cleaned)
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    return samples[len(samples) // 2] * 1e6, samples[int(len(samples) * 0.99)] * 1e6
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    keys = _lookups(n, count, seed=1)
+    with tempfile.TemporaryDirectory(prefix="srt-cache-bench-") as tmp:
+        p1, p2 = os.path.join(tmp, 'v1.sqlite'), os.path.join(tmp, 'v2.sqlite')
+        t0 = time.perf_counter()
+        c1 = build_v1(p1, n)
+        t1 = time.perf_counter()
+        translate = build_v2(p2, n)
+        c2 = translate._db_connect()
+        t2 = time.perf_counter()
+
+        def get_v1(src, tgt, cleaned):
+            h = hashlib.sha256(cleaned.encode()).hexdigest()
+            return c1.execute('SELECT text FROM translations WHERE src=? AND tgt=? AND hash=?', (src, tgt, h)).fetchone()
+
+        def get_v2(src, tgt, cleaned):
+            return translate.disk_cache_get(src, tgt, cleaned)
+
+        v1_lat = _time_lookups(get_v1, keys)
+        v2_lat = _time_lookups(get_v2, keys)
+        s1, s2 = _size(c1, p1), _size(c2, p2)
+        tables = _tables(c2)
+
+        t3 = time.perf_counter()
+        cachedb.init_schema(c1)
+        while cachedb.migrate_step(c1, 20000) or cachedb.has_legacy(c1):
+            pass
+        t4 = time.perf_counter()
+
+    print(f"rows={n} lookups={count} (50% hits)")
+    print(f"{'layout':<8}{'build s':>10}{'size MB':>10}{'p50 us':>10}{'p99 us':>10}")
+    print(f"{'v1':<8}{t1 - t0:>10.1f}{s1 / 1e6:>10.1f}{v1_lat[0]:>10.1f}{v1_lat[1]:>10.1f}")
+    print(f"{'v2':<8}{t2 - t1:>10.1f}{s2 / 1e6:>10.1f}{v2_lat[0]:>10.1f}{v2_lat[1]:>10.1f}")
+    for name, size in sorted(tables.items(), key=lambda kv: -kv[1]):
+        print(f"  v2 {name:<20}{size / 1e6:>8.1f} MB")
+    print(f"online migration v1 -> v2: {t4 - t3:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
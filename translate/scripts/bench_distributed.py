@@ -0,0 +1,90 @@
+import os
+import sys
+import time
+import random
+import tempfile
+import multiprocessing
+
+# Workers talk to a fake upstream; keep the shared disk cache out of the measurement.
+os.environ['TRANSLATE_CACHE'] = '0'
+os.environ.setdefault('TRANSLATE_HEDGE', '0')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.translator import distributed
+
+_WORDS = "the of and to in is you that it he was for on are as with his they at be this from have or by".split()
+
+
+class FakeTranslator:
+    """Stands in for GoogleTranslator: fixed latency, echoes the text (group separators included)."""
+
+    latency = 0.1
+
+    def __init__(self, source='auto', target='fr'):
+        self.target = target
+
+    def translate(self, text):
+        time.sleep(self.latency)
+        return text.upper().replace(distributed._translate.GROUP_SEP.upper(), distributed._translate.GROUP_SEP)
+
+
+def _write_srt(path: str, cues: int, seed: int):
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        for k in range(cues):
+            s = k * 2
+            text = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(3, 10)))
+            f.write(f"{k + 1}\n00:{s // 60:02d}:{s % 60:02d},000 --> 00:{s // 60:02d}:{s % 60:02d},900\n{text} {seed}.{k}\n\n")
+
+
+def _worker(url: str, concurrency: int, latency: float):
+    import asyncio
+    FakeTranslator.latency = latency
+    distributed.GoogleTranslator = FakeTranslator
+    asyncio.run(distributed.run_worker(distributed.open_queue(url), concurrency=concurrency, idle_exit=1.0))
+
+
+def bench(workers: int, files: int, cues: int, concurrency: int, latency: float):
+    with tempfile.TemporaryDirectory(prefix="srt-dist-bench-") as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'queue.sqlite')}"
+        queue = distributed.open_queue(url)
+        job_ids = []
+        tasks = 0
+        for n in range(files):
+            path = os.path.join(tmp, f"ep{n:02d}.srt")
+            _write_srt(path, cues, seed=workers * 1000 + n)
+            job_id, meta, payloads = distributed.split_file(path, 'fr', 'en')
+            queue.add_job(job_id, meta, payloads)
+            job_ids.append(job_id)
+            tasks += len(payloads)
+        t0 = time.perf_counter()
+        procs = [multiprocessing.Process(target=_worker, args=(url, concurrency, latency)) for _ in range(workers)]
+        for p in procs:
+            p.start()
+        while not all(distributed.job_finished(queue, j) for j in job_ids):
+            time.sleep(0.05)
+        elapsed = time.perf_counter() - t0
+        for p in procs:
+            p.join()
+        for job_id in job_ids:
+            distributed.assemble_job(queue, job_id)
+        return tasks, elapsed
+
+
+def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    cues = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    latency = float(sys.argv[4]) if len(sys.argv) > 4 else 0.1
+    print(f"files={files} cues/file={cues} slots/worker={concurrency} upstream latency={latency}s")
+    rows = []
+    for workers in (1, 2, 4, 8):
+        tasks, elapsed = bench(workers, files, cues, concurrency, latency)
+        rows.append((workers, tasks, elapsed))
+    print(f"{'workers':<8}{'tasks':>8}{'seconds':>10}{'tasks/s':>10}{'speedup':>10}")
+    for workers, tasks, elapsed in rows:
+        print(f"{workers:<8}{tasks:>8}{elapsed:>10.2f}{tasks / elapsed:>10.1f}{rows[0][2] / elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
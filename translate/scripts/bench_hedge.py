@@ -0,0 +1,82 @@
+import os
+import sys
+import time
+import random
+import asyncio
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.translator import hedge
+
+
+class FakeUpstream:
+    """Blocking call with a heavy tail: mostly ``base`` seconds, sometimes ``slow``."""
+
+    def __init__(self, base: float, slow: float, slow_rate: float, seed: int):
+        self.base = base
+        self.slow = slow
+        self.slow_rate = slow_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    def __call__(self):
+        with self.lock:
+            self.requests += 1
+            slow = self.rng.random() < self.slow_rate
+            jitter = self.rng.uniform(0.8, 1.2)
+        time.sleep((self.slow if slow else self.base) * jitter)
+        return "ok"
+
+
+async def _run_job(upstream, groups: int, conc: int):
+    sem = asyncio.Semaphore(conc)
+
+    async def one():
+        async with sem:
+            await hedge.call_upstream(upstream, kind='group')
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(groups)))
+    return time.perf_counter() - t0
+
+
+async def _run(jobs: int, groups: int, conc: int, upstream):
+    return [await _run_job(upstream, groups, conc) for _ in range(jobs)]
+
+
+def _pct(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def bench(enabled: bool, jobs: int, groups: int, conc: int):
+    hedge.HEDGE_ENABLED = enabled
+    hedge._TRACKERS.clear()
+    hedge._BUDGET = hedge.HedgeBudget(hedge.HEDGE_RATIO)
+    for k in hedge.HEDGE_STATS:
+        hedge.HEDGE_STATS[k] = 0
+    upstream = FakeUpstream(base=0.05, slow=1.0, slow_rate=0.02, seed=7)
+    times = asyncio.run(_run(jobs, groups, conc, upstream))
+    return {
+        'p50': _pct(times, 0.5),
+        'p99': _pct(times, 0.99),
+        'requests': upstream.requests,
+        'hedged': hedge.HEDGE_STATS['hedged'],
+        'hedge_won': hedge.HEDGE_STATS['hedge_won'],
+    }
+
+
+def main():
+    jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    groups = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    conc = int(sys.argv[3]) if len(sys.argv) > 3 else 6
+    print(f"jobs={jobs} groups/job={groups} concurrency={conc} hedge_ratio={hedge.HEDGE_RATIO}")
+    print(f"{'hedging':<10}{'job p50':>10}{'job p99':>10}{'requests':>10}{'hedged':>8}{'won':>6}")
+    for enabled in (False, True):
+        r = bench(enabled, jobs, groups, conc)
+        print(f"{'on' if enabled else 'off':<10}{r['p50']:>10.3f}{r['p99']:>10.3f}{r['requests']:>10}{r['hedged']:>8}{r['hedge_won']:>6}")
+
+
+if __name__ == "__main__":
+    main()
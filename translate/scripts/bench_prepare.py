@@ -0,0 +1,70 @@
+import os
+import sys
+import time
+import asyncio
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.translator.prepare import iter_prepared
+
+_LINES = [
+    "<i>Where were you last night?</i>",
+    "I told you, I was at the office until late.",
+    "- Don't lie to me.\n- I'm not lying!",
+    "We need to leave before the storm hits the coast.",
+    "<b>Nobody</b> leaves this room until I get an answer.",
+]
+
+
+def _ts(ms: int) -> str:
+    return f"{ms // 3600000:02d}:{ms // 60000 % 60:02d}:{ms // 1000 % 60:02d},{ms % 1000:03d}"
+
+
+def make_corpus(directory: str, files: int, cues: int):
+    paths = []
+    for n in range(files):
+        blocks = []
+        for i in range(cues):
+            start = i * 2500
+            blocks.append(f"{i + 1}\n{_ts(start)} --> {_ts(start + 2000)}\n{_LINES[(i + n) % len(_LINES)]}\n")
+        path = os.path.join(directory, f"episode{n:02d}.srt")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(blocks))
+        paths.append(path)
+    return paths
+
+
+async def _drain(paths, use_pool, workers):
+    count = 0
+    async for _ in iter_prepared(paths, use_pool=use_pool, workers=workers):
+        count += 1
+    return count
+
+
+def bench(paths, use_pool: bool, workers: int = None) -> float:
+    t0 = time.perf_counter()
+    asyncio.run(_drain(paths, use_pool, workers))
+    return time.perf_counter() - t0
+
+
+def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    cues = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    cores = os.cpu_count() or 1
+    with tempfile.TemporaryDirectory(prefix="srt-bench-") as tmp:
+        paths = make_corpus(tmp, files, cues)
+        base = bench(paths, use_pool=False)
+        print(f"files={files} cues/file={cues} cores={cores}")
+        print(f"{'mode':<12}{'seconds':>10}{'speedup':>10}")
+        print(f"{'in-process':<12}{base:>10.2f}{1.0:>10.2f}")
+        workers = 1
+        while True:
+            took = bench(paths, use_pool=True, workers=workers)
+            print(f"{f'pool x{workers}':<12}{took:>10.2f}{base / took:>10.2f}")
+            if workers >= cores:
+                break
+            workers = min(cores, workers * 2)
+
+
+if __name__ == "__main__":
+    main()
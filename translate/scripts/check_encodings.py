@@ -0,0 +1,54 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.translator.srt_utils import read_srt_text, ENCODING_SAMPLE_BYTES
+
+# Round-trips subtitles written in the legacy encodings uploads actually use
+# through read_srt_text. Exits non-zero when one comes back different.
+
+_LINES = {
+    'fr': ["C'est déjà l'été, à bientôt !", "Où est la forêt ?", "Il a reçu une lettre très étrange.", "Ça va, merci."],
+    'es': ["¿Dónde estás, señor?", "¡No lo sé, niño!", "Mañana será otro día."],
+    'he': ["שלום, מה שלומך?", "אני לא יודע למה.", "בוא נלך הביתה עכשיו."],
+    'ru': ["Привет, как дела?", "Я не знаю почему.", "Пойдём домой."],
+    'zh': ["你好，你今天怎么样？", "我不知道为什么。", "我们现在回家吧。"],
+}
+_CASES = [
+    ('fr', 'cp1252'), ('es', 'cp1252'), ('he', 'cp1255'), ('ru', 'cp1251'), ('zh', 'gbk'),
+    ('fr', 'utf-8'), ('he', 'utf-8'), ('fr', 'utf-8-sig'), ('he', 'utf-16'),
+]
+
+
+def _srt(lines, count: int) -> str:
+    out = []
+    for i in range(count):
+        ts = f"00:{i // 60 % 60:02d}:{i % 60:02d},000"
+        out.append(f"{i + 1}\n{ts} --> {ts}\n{lines[i % len(lines)]}\n")
+    return "\n".join(out)
+
+
+def _late_legacy(lang: str) -> str:
+    # Enough ASCII to fill the detection sample before the first accented cue.
+    prefix = _srt(["Hello there, how are you?"], ENCODING_SAMPLE_BYTES // 40)
+    return prefix + "\n" + _srt(_LINES[lang], 3)
+
+
+def main():
+    failures = 0
+    with tempfile.TemporaryDirectory(prefix="srt-encodings-") as tmp:
+        cases = [(lang, enc, count, _srt(_LINES[lang], count)) for lang, enc in _CASES for count in (3, 400, 4000)]
+        cases += [('fr', 'cp1252', 'late', _late_legacy('fr')), ('fr', 'utf-8', 'late', _late_legacy('fr'))]
+        for lang, enc, count, text in cases:
+            path = os.path.join(tmp, f"{lang}-{enc}-{count}.srt")
+            with open(path, 'wb') as fp:
+                fp.write(text.encode(enc))
+            ok = read_srt_text(path).lstrip('\ufeff') == text
+            failures += not ok
+            print(f"{'ok  ' if ok else 'FAIL'} {lang} {enc:<10} {count}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
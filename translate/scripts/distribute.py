@@ -0,0 +1,60 @@
+import os
+import sys
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.translator import distributed
+
+
+async def _submit(queue, args):
+    job_ids = [distributed.submit_file(queue, path, args.target, args.source) for path in args.files]
+    if not args.wait:
+        return 0
+    await distributed.wait_jobs(queue, job_ids)
+    for job_id in job_ids:
+        distributed.assemble_job(queue, job_id)
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coordinator/worker mode: spread group translation across processes and hosts.")
+    parser.add_argument("--queue", default=distributed.QUEUE_URL, help="memory:// or sqlite:///path (default: $TRANSLATE_QUEUE)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("submit", help="split files into group tasks and queue them")
+    p.add_argument("files", nargs="+")
+    p.add_argument("--target", default=os.environ.get('TARGET_LANG', 'fr'))
+    p.add_argument("--source", default=(os.environ.get('SOURCE_LANG') or 'auto'))
+    p.add_argument("--wait", action="store_true", help="wait for the workers, then write the outputs")
+
+    p = sub.add_parser("worker", help="lease and translate tasks until stopped")
+    p.add_argument("--concurrency", type=int, default=distributed.WORKER_CONCURRENCY)
+    p.add_argument("--id", dest="worker_id")
+    p.add_argument("--idle-exit", type=float, help="exit after this many seconds without work")
+
+    sub.add_parser("status", help="task counts per job")
+
+    p = sub.add_parser("assemble", help="write the output of finished jobs")
+    p.add_argument("jobs", nargs="*", help="job ids (default: every finished job)")
+    args = parser.parse_args()
+
+    queue = distributed.open_queue(args.queue)
+    if args.cmd == "submit":
+        return asyncio.run(_submit(queue, args))
+    if args.cmd == "worker":
+        done = asyncio.run(distributed.run_worker(queue, args.worker_id, args.concurrency, args.idle_exit))
+        print(f"Worker finished {done} tasks")
+        return 0
+    if args.cmd == "status":
+        for job_id in queue.jobs():
+            counts = queue.status(job_id)
+            print(f"{job_id}  {queue.job_meta(job_id)['path']}  " + "  ".join(f"{k}={v}" for k, v in counts.items()))
+        return 0
+    for job_id in args.jobs or [j for j in queue.jobs() if distributed.job_finished(queue, j)]:
+        distributed.assemble_job(queue, job_id)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,488 @@
+import os
+import sys
+import json
+import html
+import time
+import uuid
+import random
+import socket
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import http.client
+import http.server
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from src.translator.translate import GROUP_SEP
+
+# Load test for src/server/api.py.
+#
+# Starts the app with uvicorn (as render.yaml does) in a subprocess whose
+# deep-translator Google endpoint points at a local fake backend, then
+# replays a seeded mix of SRT sizes at a given concurrency and arrival
+# rate. Every response is checked: each cue must come back translated into
+# the target that request asked for, so requests leaking into each other
+# (shared env, shared files) show up as wrong_output, not just as latency.
+#
+# The JSON report (--out) can be diffed against an earlier one (--compare).
+
+_WORDS = ("the of and to in is you that it he was for on are as with his they at be this from have or by "
+          "one had not but what all were when we there can an your which their said if do will each").split()
+_ENV_KEYS = ('TRANSLATE_', 'GROUP_', 'FAST_MODE', 'CACHE_GROUP_THRESHOLD')
+
+
+# Fake upstream
+
+def fake_translate(text: str, target: str) -> str:
+    # Tag each line with the target; group separators pass through so the split still matches.
+    return '\n'.join(
+        ln if (not ln.strip() or ln.strip() == GROUP_SEP) else f"{target}|{ln}" for ln in text.split('\n')
+    )
+
+
+class FakeBackend(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency: float, jitter: float, throttle_rate: float, seed: int):
+        super().__init__(('127.0.0.1', 0), _FakeHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.throttled = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/m"
+
+
+class _FakeHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        backend = self.server
+        params = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+        with backend.lock:
+            backend.calls += 1
+            delay = backend.latency * backend.rng.uniform(1 - backend.jitter, 1 + backend.jitter)
+            throttle = backend.rng.random() < backend.throttle_rate
+            if throttle:
+                backend.throttled += 1
+        time.sleep(max(0.0, delay))
+        if throttle:
+            self.send_response(429)
+            self.end_headers()
+            return
+        text = fake_translate(params.get('q', [''])[0], params.get('tl', ['fr'])[0])
+        body = f'<html><body><div class="result-container">{html.escape(text)}</div></body></html>'.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+# App under test
+
+def serve(port: int, backend_url: str):
+    from deep_translator import constants
+    constants.BASE_URLS['GOOGLE_TRANSLATE'] = backend_url
+    import uvicorn
+    uvicorn.run('src.server.api:app', host='127.0.0.1', port=port, log_level='warning')
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_app(backend_url: str, workdir: str):
+    port = _free_port()
+    env = os.environ.copy()
+    # Cold, private state per run so reports are comparable.
+    env.update({
+        'PYTHONPATH': ROOT,
+        'TRANSLATE_CACHE_PATH': os.path.join(workdir, 'cache.sqlite'),
+        'TRANSLATE_TELEMETRY_PATH': os.path.join(workdir, 'telemetry.sqlite'),
+    })
+    env.pop('TRANSLATE_JOURNAL_DIR', None)
+    log = open(os.path.join(workdir, 'server.log'), 'wb')
+    proc = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), 'serve', '--port', str(port), '--backend', backend_url],
+        # No stdin, as when deployed: a missing TARGET_LANG must not block on the interactive prompt.
+        cwd=workdir, env=env, stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited early, see {log.name}")
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/health')
+            if conn.getresponse().status == 200:
+                return proc, f"http://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("server did not become healthy within 60s")
+
+
+class RssSampler(threading.Thread):
+    """Samples a process's resident set size from /proc (Linux); values stay None elsewhere."""
+
+    def __init__(self, pid: int, interval: float = 0.05):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.current = None
+        self.peak = None
+        self._stop_event = threading.Event()
+
+    def read(self):
+        try:
+            with open(f"/proc/{self.pid}/status") as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        return int(line.split()[1]) / 1024.0
+        except OSError:
+            return None
+        return None
+
+    def reset_peak(self):
+        self.peak = self.current
+
+    def run(self):
+        while not self._stop_event.is_set():
+            rss = self.read()
+            if rss is not None:
+                self.current = rss
+                self.peak = rss if self.peak is None else max(self.peak, rss)
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+
+
+# Workload
+
+def make_srt(cues: int, seed: int) -> bytes:
+    rng = random.Random(seed)
+    out = []
+    for k in range(cues):
+        start = k * 2500
+        end = start + 2000
+        text = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(3, 12)))
+        if rng.random() < 0.3:
+            text += "\n" + " ".join(rng.choice(_WORDS) for _ in range(rng.randint(2, 8)))
+        if rng.random() < 0.1:
+            text = f"<i>{text}</i>"
+        out.append(f"{k + 1}\n{_ts(start)} --> {_ts(end)}\n{text}\n")
+    return "\n".join(out).encode('utf-8')
+
+
+def _ts(ms: int) -> str:
+    return f"{ms // 3600000:02d}:{ms // 60000 % 60:02d}:{ms // 1000 % 60:02d},{ms % 1000:03d}"
+
+
+def parse_mix(spec: str):
+    """'20:5,200:3,2000:1' -> [(cues, weight), ...]"""
+    mix = []
+    for part in spec.split(','):
+        cues, _, weight = part.partition(':')
+        mix.append((int(cues), float(weight or 1)))
+    return mix
+
+
+def build_plan(n: int, mix, targets, rate: float, seed: int):
+    rng = random.Random(seed)
+    sizes = [c for c, _ in mix]
+    weights = [w for _, w in mix]
+    at = 0.0
+    plan = []
+    for k in range(n):
+        if rate > 0:
+            at += rng.expovariate(rate)
+        cues = rng.choices(sizes, weights)[0]
+        plan.append({'at': at if rate > 0 else None, 'cues': cues, 'target': targets[k % len(targets)],
+                     'body': make_srt(cues, seed * 100003 + k)})
+    return plan
+
+
+def _multipart(fields: dict, filename: str, data: bytes):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    parts.append(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f'Content-Type: application/x-subrip\r\n\r\n'.encode() + data + b'\r\n'
+    )
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def output_ok(body: bytes, cues: int, target: str) -> bool:
+    import pysrt
+    try:
+        subs = pysrt.from_string(body.decode('utf-8'))
+    except Exception:
+        return False
+    if len(subs) != cues:
+        return False
+    prefix = f"{target}|"
+    return all(ln.startswith(prefix) for sub in subs for ln in sub.text_without_tags.split('\n') if ln.strip())
+
+
+def send(base_url: str, item: dict, timeout: float):
+    u = urllib.parse.urlparse(base_url)
+    body, ctype = _multipart({'target': item['target'], 'source': 'en'}, f"load_{item['cues']}.srt", item['body'])
+    conn = http.client.HTTPConnection(u.hostname, u.port, timeout=timeout)
+    try:
+        conn.request('POST', '/translate', body=body, headers={'Content-Type': ctype})
+        resp = conn.getresponse()
+        return resp.status, resp.read()
+    finally:
+        conn.close()
+
+
+def run_load(base_url: str, plan, concurrency: int, timeout: float):
+    results = []
+    lock = threading.Lock()
+    inflight = {'now': 0, 'max': 0}
+    t0 = time.perf_counter()
+
+    def one(item):
+        if item['at'] is not None:
+            delay = t0 + item['at'] - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        start = time.perf_counter()
+        with lock:
+            inflight['now'] += 1
+            inflight['max'] = max(inflight['max'], inflight['now'])
+        try:
+            status, body = send(base_url, item, timeout)
+            error = None
+        except Exception as e:
+            status, body, error = None, b'', type(e).__name__
+        end = time.perf_counter()
+        with lock:
+            inflight['now'] -= 1
+        # Open loop: latency counts from the scheduled arrival, so client-side queueing is not hidden.
+        arrival = t0 + item['at'] if item['at'] is not None else start
+        results.append({
+            'cues': item['cues'], 'status': status, 'error': error,
+            'latency': end - arrival, 'service': end - start,
+            'ok': status == 200 and output_ok(body, item['cues'], item['target']),
+        })
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, plan))
+    return results, time.perf_counter() - t0, inflight['max']
+
+
+# Report
+
+def _pct(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _ms_summary(values):
+    if not values:
+        return {}
+    return {
+        'p50': round(_pct(values, 0.5) * 1000, 1),
+        'p90': round(_pct(values, 0.9) * 1000, 1),
+        'p99': round(_pct(values, 0.99) * 1000, 1),
+        'max': round(max(values) * 1000, 1),
+        'mean': round(sum(values) / len(values) * 1000, 1),
+    }
+
+
+def _git_commit():
+    try:
+        rev = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True)
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                               capture_output=True, text=True, check=True)
+        return rev.stdout.strip() + ('-dirty' if dirty.stdout.strip() else '')
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_report(args, results, elapsed, max_inflight, backend, memory):
+    status = {}
+    for r in results:
+        key = str(r['status']) if r['status'] is not None else (r['error'] or 'error')
+        status[key] = status.get(key, 0) + 1
+    ok = [r for r in results if r['status'] == 200]
+    by_size = {}
+    for cues in sorted({r['cues'] for r in results}):
+        lat = [r['latency'] for r in ok if r['cues'] == cues]
+        by_size[str(cues)] = {'n': sum(1 for r in results if r['cues'] == cues), **_ms_summary(lat)}
+    report = {
+        'commit': _git_commit(),
+        'started': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+        'config': {
+            'requests': args.requests, 'concurrency': args.concurrency, 'rate': args.rate, 'mix': args.mix,
+            'targets': args.targets, 'seed': args.seed, 'upstream_latency': args.latency,
+            'upstream_jitter': args.jitter, 'upstream_throttle': args.throttle,
+            'env': {k: v for k, v in sorted(os.environ.items()) if k.startswith(_ENV_KEYS)},
+        },
+        'elapsed_s': round(elapsed, 2),
+        'throughput_rps': round(len(ok) / elapsed, 2) if elapsed else None,
+        'cues_per_s': round(sum(r['cues'] for r in ok) / elapsed, 1) if elapsed else None,
+        'status': status,
+        'wrong_output': sum(1 for r in ok if not r['ok']),
+        'max_inflight': max_inflight,
+        'latency_ms': _ms_summary([r['latency'] for r in ok]),
+        'service_ms': _ms_summary([r['service'] for r in ok]),
+        'by_size': by_size,
+        'upstream_calls': backend.calls if backend else None,
+        'upstream_throttled': backend.throttled if backend else None,
+        'memory_mb': memory,
+    }
+    return report
+
+
+def print_report(report):
+    print(f"commit {report['commit']}  {report['config']['requests']} requests, concurrency {report['config']['concurrency']},"
+          f" rate {report['config']['rate'] or 'closed-loop'}, mix {report['config']['mix']}")
+    print(f"  throughput   {report['throughput_rps']} req/s, {report['cues_per_s']} cues/s in {report['elapsed_s']}s")
+    print(f"  status       {report['status']}   wrong output: {report['wrong_output']}")
+    lat = report['latency_ms']
+    if lat:
+        print(f"  latency ms   p50 {lat['p50']}  p90 {lat['p90']}  p99 {lat['p99']}  max {lat['max']}")
+    for cues, row in report['by_size'].items():
+        if 'p50' in row:
+            print(f"    {cues:>6} cues  n={row['n']:<4} p50 {row['p50']}  p99 {row['p99']}")
+    print(f"  upstream     {report['upstream_calls']} calls ({report['upstream_throttled']} throttled)")
+    mem = report['memory_mb']
+    if mem and mem.get('peak') is not None:
+        print(f"  server RSS   idle {mem['idle']} MB, peak {mem['peak']} MB, end {mem['end']} MB,"
+              f" ~{mem['per_inflight']} MB per in-flight request (max in flight {report['max_inflight']})")
+
+
+_COMPARE = [
+    ('throughput_rps', ('throughput_rps',), True),
+    ('latency p50 ms', ('latency_ms', 'p50'), False),
+    ('latency p99 ms', ('latency_ms', 'p99'), False),
+    ('peak RSS MB', ('memory_mb', 'peak'), False),
+    ('MB per in-flight', ('memory_mb', 'per_inflight'), False),
+    ('wrong_output', ('wrong_output',), False),
+    ('upstream_calls', ('upstream_calls',), False),
+]
+
+
+def compare(old: dict, new: dict):
+    print(f"\n{'metric':<20}{old.get('commit') or 'old':>14}{new.get('commit') or 'new':>14}{'change':>10}")
+    for label, path, higher_better in _COMPARE:
+        a, b = old, new
+        for key in path:
+            a = a.get(key) if isinstance(a, dict) else None
+            b = b.get(key) if isinstance(b, dict) else None
+        change = ''
+        if isinstance(a, (int, float)) and isinstance(b, (int, float)) and a:
+            delta = (b - a) / a * 100
+            better = delta > 0 if higher_better else delta < 0
+            change = f"{delta:+.1f}%" + (' ' if abs(delta) < 5 else (' +' if better else ' -'))
+        print(f"{label:<20}{str(a):>14}{str(b):>14}{change:>10}")
+    if old.get('config') != new.get('config'):
+        print("note: configs differ, numbers are not directly comparable")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the translate API against a local fake translation backend.")
+    sub = parser.add_subparsers(dest="cmd")
+    p = sub.add_parser("serve", help=argparse.SUPPRESS)
+    p.add_argument("--port", type=int, required=True)
+    p.add_argument("--backend", required=True)
+
+    parser.add_argument("--requests", type=int, default=60)
+    parser.add_argument("--concurrency", type=int, default=8, help="client connections")
+    parser.add_argument("--rate", type=float, default=0.0, help="Poisson arrivals per second (0 = closed loop)")
+    parser.add_argument("--mix", default="20:5,200:3,1000:1", help="cues:weight,... of uploaded SRT sizes")
+    parser.add_argument("--targets", default="fr,es,de", help="target languages, rotated per request")
+    parser.add_argument("--latency", type=float, default=0.05, help="fake upstream latency per call (s)")
+    parser.add_argument("--jitter", type=float, default=0.3, help="relative latency jitter")
+    parser.add_argument("--throttle", type=float, default=0.0, help="share of upstream calls answered with 429")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--warmup", type=int, default=2, help="small sequential requests before measuring")
+    parser.add_argument("--timeout", type=float, default=60, help="per-request client timeout (s)")
+    parser.add_argument("--url", help="test an already running server instead (no fake backend, no memory stats)")
+    parser.add_argument("--out", help="write the JSON report here")
+    parser.add_argument("--compare", help="earlier JSON report to compare against")
+    args = parser.parse_args()
+
+    if args.cmd == "serve":
+        serve(args.port, args.backend)
+        return 0
+
+    targets = [t.strip() for t in args.targets.split(',') if t.strip()]
+    plan = build_plan(args.requests, parse_mix(args.mix), targets, args.rate, args.seed)
+    warmup = build_plan(args.warmup, [(10, 1)], targets, 0, args.seed + 1)
+    backend = proc = sampler = None
+    with tempfile.TemporaryDirectory(prefix="srt-load-") as tmp:
+        try:
+            if args.url:
+                base_url = args.url.rstrip('/')
+            else:
+                backend = FakeBackend(args.latency, args.jitter, args.throttle, args.seed)
+                threading.Thread(target=backend.serve_forever, daemon=True).start()
+                proc, base_url = start_app(backend.url, tmp)
+                sampler = RssSampler(proc.pid)
+                sampler.start()
+            for item in warmup:
+                send(base_url, item, args.timeout)
+            memory = None
+            if sampler is not None:
+                time.sleep(0.3)
+                idle = sampler.read()
+                sampler.reset_peak()
+            if backend is not None:
+                backend.calls = backend.throttled = 0
+            results, elapsed, max_inflight = run_load(base_url, plan, args.concurrency, args.timeout)
+            if sampler is not None and sampler.peak is not None and idle is not None:
+                memory = {
+                    'idle': round(idle, 1), 'peak': round(sampler.peak, 1), 'end': round(sampler.read() or 0, 1),
+                    'per_inflight': round((sampler.peak - idle) / max(1, max_inflight), 2),
+                }
+        finally:
+            if sampler is not None:
+                sampler.stop()
+            if proc is not None:
+                proc.terminate()
+                try:
+                    proc.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+            if backend is not None:
+                backend.shutdown()
+
+    report = build_report(args, results, elapsed, max_inflight, backend, memory)
+    print_report(report)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report: {args.out}")
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(json.load(f), report)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,39 @@
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.translator import cachedb
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate the translation cache to the v2 layout and optionally evict idle entries.")
+    parser.add_argument("path", nargs="?", default=os.environ.get('TRANSLATE_CACHE_PATH', '.translate_cache.sqlite'))
+    parser.add_argument("--batch", type=int, default=5000, help="rows per transaction (keeps the cache usable meanwhile)")
+    parser.add_argument("--evict-days", type=int, help="delete entries idle for this many days")
+    parser.add_argument("--vacuum", action="store_true", help="reclaim freed pages afterwards")
+    args = parser.parse_args()
+
+    conn = cachedb.connect(args.path)
+    cachedb.init_schema(conn)
+    conn.commit()
+    moved = 0
+    t0 = time.perf_counter()
+    while True:
+        n = cachedb.migrate_step(conn, args.batch)
+        if n == 0 and not cachedb.has_legacy(conn):
+            break
+        moved += n
+    print(f"Migrated {moved} rows in {time.perf_counter() - t0:.1f}s")
+    if args.evict_days is not None:
+        with conn:
+            print(f"Evicted {cachedb.evict(conn, args.evict_days)} entries idle for {args.evict_days}+ days")
+    if args.vacuum:
+        conn.execute('VACUUM')
+    conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
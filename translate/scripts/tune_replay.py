@@ -0,0 +1,33 @@
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.translator.tuner import load_history, replay, config_costs
+
+
+def main():
+    src = sys.argv[1] if len(sys.argv) > 2 else None
+    tgt = sys.argv[2] if len(sys.argv) > 2 else None
+    history = load_history(src, tgt, limit=100000)
+    if not history:
+        print(json.dumps({"ok": False, "error": "no recorded jobs"}))
+        return 1
+    costs = config_costs(history)
+    report = {
+        "jobs": len(history),
+        "configs": [
+            {"group_max_chars": c[0], "group_max_blocks": c[1], "concurrency": c[2], "jobs": n, "mean_cost": cost}
+            for c, (n, cost) in sorted(costs.items(), key=lambda kv: kv[1][1])
+        ],
+        "policies": [replay(history, policy) for policy in ("recorded", "tuner", "best")],
+    }
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 2:
+        print("Usage: python scripts/tune_replay.py [<source> <target>]")
+        sys.exit(1)
+    sys.exit(main())
@@ -1,7 +1,12 @@
+import os
 import sys
 import json
 import re
 
+# Allow running as `python scripts/validate_srt.py` from translate/ (script dir is sys.path[0]).
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.translator.srt_utils import read_srt_text
+
 
 def strict_scan(text: str):
     # Strictly require timecode lines with the exact arrow "-->" and valid hh:mm:ss,mmm formats.
@@ -44,20 +49,16 @@ def main():
         return 2
     path = sys.argv[1]
     try:
-        # First, strict regex scan of the raw file to catch common formatting mistakes (e.g., '->' instead of '-->').
-        with open(path, "r", encoding="utf-8", errors="ignore") as f:
-            raw = f.read()
+        # Decode once (BOM / charset detection), then strict regex scan of the text to catch common formatting mistakes (e.g., '->' instead of '-->').
+        raw = read_srt_text(path)
         ok, err = strict_scan(raw)
         if not ok:
             print(json.dumps({"ok": False, "error": err}))
             return 2
 
-        # Then try parsing with pysrt for deeper validation
+        # Then parse the same decoded text with pysrt for deeper validation
         import pysrt
-        try:
-            subs = pysrt.open(path, encoding='utf-8')
-        except UnicodeDecodeError:
-            subs = pysrt.open(path)
+        subs = pysrt.from_string(raw)
         if len(subs) == 0:
             print(json.dumps({"ok": False, "error": "empty srt"}))
             return 2
@@ -0,0 +1,37 @@
+import os
+import sys
+import json
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.translator.srt_utils import detect_file_language
+from src.translator.translate import cache_coverage
+from src.translator.warm import warm_cache, load_subs
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Bulk-load previously translated <base>.srt / <base>_<lang>.srt pairs into the translation cache.",
+    )
+    parser.add_argument("paths", nargs="*", help="directories or .srt files to scan for translated pairs")
+    parser.add_argument("--source", help="source language of the corpus (detected per file by default)")
+    parser.add_argument("--check", metavar="SRT", help="report how much of this file the cache would serve")
+    parser.add_argument("--target", default="fr", help="target language for --check (default: fr)")
+    args = parser.parse_args()
+
+    if not args.paths and not args.check:
+        parser.print_usage()
+        return 2
+    result = {}
+    if args.paths:
+        result["warm"] = warm_cache(args.paths, source_lang=args.source)
+    if args.check:
+        subs = load_subs(args.check)
+        source = (args.source or detect_file_language(subs)).lower()
+        result["coverage"] = cache_coverage(subs, source, args.target.lower())
+    print(json.dumps(result))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
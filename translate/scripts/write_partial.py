@@ -0,0 +1,30 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pysrt
+from src.translator.srt_utils import read_srt_text
+from src.translator.journal import source_digest, journal_key, journal_path, load_journal, write_partial
+
+
+def main(path: str, target: str, source: str = 'auto'):
+    source_text = read_srt_text(path)
+    subs = pysrt.from_string(source_text)
+    base, _ = os.path.splitext(path)
+    output_srt = f"{base}_{target}.srt"
+    key = journal_key(source_digest(source_text), source, target)
+    journal = load_journal(journal_path(output_srt, key), key)
+    if not journal.completed:
+        print("No checkpoint found for this file/target.")
+        return 1
+    partial_path = f"{output_srt}.partial"
+    done = write_partial(subs, journal, partial_path)
+    print(f"Wrote {partial_path}: {done}/{len(subs)} cues translated")
+    return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python scripts/write_partial.py <file.srt> <target> [source]")
+        sys.exit(1)
+    sys.exit(main(sys.argv[1], sys.argv[2].strip().lower(), (sys.argv[3] if len(sys.argv) > 3 else 'auto').strip().lower()))
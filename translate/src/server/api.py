@@ -1,7 +1,7 @@
 import os
 import tempfile
 import subprocess
-from typing import Optional
+from typing import List, Optional
 
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException
 from fastapi.responses import Response, RedirectResponse
@@ -10,12 +10,8 @@ from fastapi.middleware.cors import CORSMiddleware
 app = FastAPI(title="SRT Translate Backend", version="1.0.0")
 
 
-def _strict_validate_bytes(data: bytes) -> Optional[str]:
+def _strict_validate_text(text: str) -> Optional[str]:
     import re
-    try:
-        text = data.decode("utf-8", errors="ignore")
-    except Exception:
-        text = data.decode(errors="ignore")
     ts = r"\d{2}:\d{2}:\d{2},\d{3}"
     allowed = re.compile(rf"^\s*{ts}\s+-->\s+{ts}(?:\s+.*)?$")
     two_ts_anywhere = re.compile(rf"{ts}.*{ts}")
@@ -53,23 +49,16 @@ def health():
 
 @app.post("/validate")
 async def validate(file: UploadFile = File(...)):
+    from ..translator.srt_utils import decode_srt_bytes
     raw = await file.read()
-    msg = _strict_validate_bytes(raw)
+    text = decode_srt_bytes(raw)
+    msg = _strict_validate_text(text)
     if msg:
         raise HTTPException(status_code=400, detail=msg)
     import pysrt
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".srt") as tmp:
-        tmp.write(raw)
-        tmp_path = tmp.name
-    try:
-        subs = pysrt.open(tmp_path, encoding='utf-8')
-        if len(subs) == 0:
-            raise HTTPException(status_code=400, detail="empty srt")
-    finally:
-        try:
-            os.unlink(tmp_path)
-        except Exception:
-            pass
+    subs = pysrt.from_string(text)
+    if len(subs) == 0:
+        raise HTTPException(status_code=400, detail="empty srt")
     return {"ok": True}
 
 
@@ -100,12 +89,9 @@ async def translate(
             "USE_DOMINANT_FOR_GROUP": env.get("USE_DOMINANT_FOR_GROUP", "1"),
             "ALLOW_GROUP_AUTO": env.get("ALLOW_GROUP_AUTO", "1"),
             "GROUP_DEEP": str(group_deep or "1"),
-            "GROUP_MAX_CHARS": env.get("GROUP_MAX_CHARS", "2200"),
-            "GROUP_MAX_BLOCKS": env.get("GROUP_MAX_BLOCKS", "12"),
-            "GROUP_MAX_GAP_MS": env.get("GROUP_MAX_GAP_MS", "3000"),
             "CACHE_GROUP_THRESHOLD": env.get("CACHE_GROUP_THRESHOLD", "0.4"),
-            "TRANSLATE_CONCURRENCY": env.get("TRANSLATE_CONCURRENCY", "6"),
         })
+        # Group size / concurrency are left to the tuner unless set explicitly in the environment.
 
         cwd = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))  # translate/
         try:
@@ -137,12 +123,16 @@ async def translate(
     }
     return Response(content=data, status_code=200, headers=headers)
 import os
+import hmac
 import asyncio
 import tempfile
-from fastapi import FastAPI, UploadFile, File, Form
+from fastapi import FastAPI, UploadFile, File, Form, Request, Header
 from fastapi.responses import Response
 
 from ..translator import translate as t
+from ..translator.scheduler import get_scheduler, SchedulerBusy
+from ..translator.srt_utils import decode_srt_bytes, detect_file_language
+from ..translator.warm import warm_cache
 
 app = FastAPI(title="SRT Translator API")
 
@@ -172,64 +162,113 @@ async def root_redirect():
 
 @app.post("/validate")
 async def validate_endpoint(file: UploadFile = File(...)):
-    import os
-    import tempfile
     try:
         import pysrt
     except Exception as e:
         return Response(content=str(e).encode(), status_code=500)
-    with tempfile.TemporaryDirectory(prefix="srt-val-") as tmp:
-        safe_name = os.path.basename(file.filename or "input.srt")
-        safe_name = "".join(c if c.isalnum() or c in "._-" else "_" for c in safe_name) or "input.srt"
-        in_path = os.path.join(tmp, safe_name)
-        data = await file.read()
-        with open(in_path, "wb") as f:
-            f.write(data)
-        try:
-            try:
-                subs = pysrt.open(in_path, encoding='utf-8')
-            except UnicodeDecodeError:
-                subs = pysrt.open(in_path)
-            if len(subs) == 0:
-                return Response(content=b"empty srt", status_code=400)
-        except Exception as e:
-            return Response(content=str(e).encode(), status_code=400)
+    data = await file.read()
+    try:
+        subs = pysrt.from_string(decode_srt_bytes(data))
+        if len(subs) == 0:
+            return Response(content=b"empty srt", status_code=400)
+    except Exception as e:
+        return Response(content=str(e).encode(), status_code=400)
     return {"ok": True}
 
 
+def _safe_filename(name: Optional[str]) -> str:
+    safe_name = os.path.basename(name or "input.srt")
+    return "".join(c if c.isalnum() or c in "._-" else "_" for c in safe_name) or "input.srt"
+
+
+def _admin_denied(authorization: Optional[str]) -> Optional[Response]:
+    """Admin endpoints are off unless TRANSLATE_ADMIN_TOKEN is set, then need ``Authorization: Bearer <token>``."""
+    token = os.environ.get("TRANSLATE_ADMIN_TOKEN")
+    if not token:
+        return Response(content=b"not found", status_code=404)
+    scheme, _, given = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(given.strip().encode(), token.encode()):
+        return Response(content=b"forbidden", status_code=403)
+    return None
+
+
+@app.post("/cache/warm")
+async def cache_warm_endpoint(
+    files: List[UploadFile] = File(...),
+    source: str = Form(""),
+    authorization: Optional[str] = Header(None),
+):
+    """Load uploaded <base>.srt / <base>_<lang>.srt pairs into the shared translation cache (admin only)."""
+    denied = _admin_denied(authorization)
+    if denied is not None:
+        return denied
+    with tempfile.TemporaryDirectory(prefix="srt-warm-") as tmp:
+        for upload in files:
+            with open(os.path.join(tmp, _safe_filename(upload.filename)), "wb") as f:
+                f.write(await upload.read())
+        stats = await asyncio.to_thread(warm_cache, [tmp], (source or "").lower() or None)
+    return stats
+
+
+@app.post("/cache/coverage")
+async def cache_coverage_endpoint(
+    file: UploadFile = File(...),
+    target: str = Form("fr"),
+    source: str = Form("auto"),
+):
+    import pysrt
+    subs = pysrt.from_string(decode_srt_bytes(await file.read()))
+    src = (source or "auto").lower()
+    if src == "auto":
+        src = detect_file_language(subs)
+    return await asyncio.to_thread(t.cache_coverage, subs, src, (target or "fr").lower())
+
+
+async def _await_unless_disconnected(request: Request, task: "asyncio.Task", poll_s: float = 0.5) -> bool:
+    """Wait for ``task``; cancel it and return False if the client goes away first."""
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=poll_s)
+        if done:
+            task.result()
+            return True
+        if await request.is_disconnected():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            return False
+
+
 @app.post("/translate")
 async def translate_endpoint(
+    request: Request,
     file: UploadFile = File(...),
     target: str = Form("fr"),
     source: str = Form("auto"),
     group_deep: str = Form("1"),
 ):
-    with tempfile.TemporaryDirectory(prefix="srt-") as tmp:
-        safe_name = os.path.basename(file.filename or "input.srt")
-        safe_name = "".join(c if c.isalnum() or c in "._-" else "_" for c in safe_name) or "input.srt"
-        in_path = os.path.join(tmp, safe_name)
+    scheduler = get_scheduler()
+    try:
+        job = scheduler.open_job(limit=scheduler.capacity)
+    except SchedulerBusy as e:
+        return Response(content=str(e).encode(), status_code=429, headers={"Retry-After": str(e.retry_after)})
+    with job, tempfile.TemporaryDirectory(prefix="srt-") as tmp:
+        in_path = os.path.join(tmp, _safe_filename(file.filename))
         data = await file.read()
         with open(in_path, "wb") as f:
             f.write(data)
 
-        env = os.environ.copy()
-        env.update({
-            "INPUT_SRT": in_path,
-            "TARGET_LANG": (target or "fr").lower(),
-            "SOURCE_LANG": (source or "auto").lower(),
-            "GROUP_DEEP": "1" if str(group_deep) != "0" else "0",
-            "OFFER_DOWNLOAD": "0",
-            "AUTO_DOWNLOAD": "0",
-            "TRANSLATE_CACHE_PATH": os.path.join(tmp, ".translate_cache.sqlite"),
-        })
-        old_env = os.environ.copy()
-        try:
-            os.environ.clear()
-            os.environ.update(env)
-            await t.translate_srt_file()
-        finally:
-            os.environ.clear()
-            os.environ.update(old_env)
+        task = asyncio.create_task(t.translate_srt_file(
+            job=job,
+            input_srt=in_path,
+            target_lang=(target or "fr").lower(),
+            source_lang=(source or "auto").lower(),
+            group_deep=str(group_deep) != "0",
+            offer_download=False,
+        ))
+        if not await _await_unless_disconnected(request, task):
+            return Response(content=b"", status_code=499)
 
         base, _ = os.path.splitext(in_path)
         out_path = f"{base}_{(target or 'fr').lower()}.srt"
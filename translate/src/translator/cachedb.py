@@ -0,0 +1,235 @@
+import os
+import time
+import zlib
+import sqlite3
+import hashlib
+
+# v2 layout of the translation cache.
+#
+#   lang_pairs(id, src, tgt)               interned language pairs
+#   translations_v2(pair, digest, value, flags, atime)  WITHOUT ROWID
+#
+# digest is the first 16 bytes of SHA-256 over the tag-protected source
+# text, value is UTF-8 (zlib-compressed when flags & FLAG_ZLIB), atime is
+# the last access in days since the epoch and is bumped at most once per
+# day per row, so reads stay read-only most of the time.
+#
+# The v1 `translations(src, tgt, hash, text)` table is migrated online:
+# reads fall back to it (and promote hits into v2), and migrate_step()
+# moves it over in small batches, dropping it once empty.
+#
+# Per-connection state (interned pair ids, whether v1 is still around)
+# lives on the Connection returned by connect(); plain sqlite3
+# connections work too, they just re-query it.
+
+SCHEMA_VERSION = 2
+FLAG_ZLIB = 1
+COMPRESS_MIN_BYTES = int(os.environ.get('TRANSLATE_CACHE_COMPRESS_MIN', '256'))
+DIGEST_BYTES = 16
+_SQL_CHUNK = 500
+
+
+
+class Connection(sqlite3.Connection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pair_ids = {}
+        self.legacy = None
+
+
+def connect(path: str, **kwargs):
+    conn = sqlite3.connect(path, factory=Connection, **kwargs)
+    conn.execute('PRAGMA journal_mode=WAL;')
+    conn.execute('PRAGMA synchronous=NORMAL;')
+    return conn
+
+
+def init_schema(conn):
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS lang_pairs ('
+        ' id INTEGER PRIMARY KEY,'
+        ' src TEXT NOT NULL,'
+        ' tgt TEXT NOT NULL,'
+        ' UNIQUE (src, tgt)'
+        ');'
+    )
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS translations_v2 ('
+        ' pair INTEGER NOT NULL,'
+        ' digest BLOB NOT NULL,'
+        ' value BLOB NOT NULL,'
+        ' flags INTEGER NOT NULL DEFAULT 0,'
+        ' atime INTEGER NOT NULL,'
+        ' PRIMARY KEY (pair, digest)'
+        ') WITHOUT ROWID;'
+    )
+    conn.execute(f'PRAGMA user_version={SCHEMA_VERSION};')
+
+
+def digest(cleaned: str) -> bytes:
+    return hashlib.sha256(cleaned.encode('utf-8', errors='ignore')).digest()[:DIGEST_BYTES]
+
+
+def today() -> int:
+    return int(time.time() // 86400)
+
+
+def encode_value(text: str):
+    raw = text.encode('utf-8')
+    if len(raw) >= COMPRESS_MIN_BYTES:
+        packed = zlib.compress(raw, 6)
+        if len(packed) < len(raw):
+            return packed, FLAG_ZLIB
+    return raw, 0
+
+
+def decode_value(value: bytes, flags: int) -> str:
+    if flags & FLAG_ZLIB:
+        value = zlib.decompress(value)
+    return bytes(value).decode('utf-8')
+
+
+def pair_id(conn, src: str, tgt: str, create: bool = True):
+    cached = getattr(conn, 'pair_ids', {})
+    if (src, tgt) in cached:
+        return cached[(src, tgt)]
+    row = conn.execute('SELECT id FROM lang_pairs WHERE src=? AND tgt=?', (src, tgt)).fetchone()
+    if row is None:
+        if not create:
+            return None
+        conn.execute('INSERT OR IGNORE INTO lang_pairs(src, tgt) VALUES (?, ?)', (src, tgt))
+        row = conn.execute('SELECT id FROM lang_pairs WHERE src=? AND tgt=?', (src, tgt)).fetchone()
+    cached[(src, tgt)] = row[0]
+    return row[0]
+
+
+def _legacy_exists(conn) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='translations'").fetchone() is not None
+
+
+def _set_legacy(conn, present: bool):
+    if isinstance(conn, Connection):
+        conn.legacy = present
+
+
+def has_legacy(conn) -> bool:
+    legacy = getattr(conn, 'legacy', None)
+    if legacy is None:
+        legacy = _legacy_exists(conn)
+        _set_legacy(conn, legacy)
+    return legacy
+
+
+def _legacy_get_many(conn, src: str, tgt: str, by_digest: dict) -> dict:
+    found = {}
+    hexes = {d: hashlib.sha256(c.encode('utf-8', errors='ignore')).hexdigest() for d, c in by_digest.items()}
+    by_hex = {h: d for d, h in hexes.items()}
+    keys = list(by_hex)
+    try:
+        for k in range(0, len(keys), _SQL_CHUNK):
+            chunk = keys[k:k + _SQL_CHUNK]
+            marks = ','.join('?' * len(chunk))
+            cur = conn.execute(
+                f'SELECT hash, text FROM translations WHERE src=? AND tgt=? AND hash IN ({marks})', (src, tgt, *chunk)
+            )
+            for h, text in cur:
+                found[by_hex[h]] = text
+    except sqlite3.OperationalError:
+        # Dropped by a concurrent migration.
+        _set_legacy(conn, False)
+    return found
+
+
+def get_many(conn, src: str, tgt: str, cleaned_list) -> dict:
+    """Return {cleaned: translated} for the entries present; touches atime, promotes v1 hits. Caller commits."""
+    by_digest = {}
+    for cleaned in cleaned_list:
+        by_digest.setdefault(digest(cleaned), cleaned)
+    found = {}
+    pair = pair_id(conn, src, tgt, create=False)
+    now = today()
+    if pair is not None:
+        digests = list(by_digest)
+        stale = []
+        for k in range(0, len(digests), _SQL_CHUNK):
+            chunk = digests[k:k + _SQL_CHUNK]
+            marks = ','.join('?' * len(chunk))
+            cur = conn.execute(
+                f'SELECT digest, value, flags, atime FROM translations_v2 WHERE pair=? AND digest IN ({marks})',
+                (pair, *chunk),
+            )
+            for d, value, flags, atime in cur:
+                d = bytes(d)
+                found[by_digest[d]] = decode_value(value, flags)
+                if atime < now:
+                    stale.append((now, pair, d))
+        if stale:
+            conn.executemany('UPDATE translations_v2 SET atime=? WHERE pair=? AND digest=?', stale)
+    if has_legacy(conn) and len(found) < len(by_digest):
+        missing = {d: c for d, c in by_digest.items() if c not in found}
+        legacy = _legacy_get_many(conn, src, tgt, missing)
+        if legacy:
+            put_many(conn, [(src, tgt, missing[d], text) for d, text in legacy.items()])
+            for d, text in legacy.items():
+                found[missing[d]] = text
+    return found
+
+
+def get(conn, src: str, tgt: str, cleaned: str):
+    return get_many(conn, src, tgt, [cleaned]).get(cleaned)
+
+
+def put_many(conn, entries) -> int:
+    """Upsert (src, tgt, cleaned, translated) entries. Caller commits."""
+    now = today()
+    rows = []
+    for src, tgt, cleaned, translated in entries:
+        value, flags = encode_value(translated)
+        rows.append((pair_id(conn, src, tgt), digest(cleaned), value, flags, now))
+    conn.executemany(
+        'INSERT OR REPLACE INTO translations_v2(pair, digest, value, flags, atime) VALUES (?, ?, ?, ?, ?)', rows
+    )
+    return len(rows)
+
+
+def migrate_step(conn, batch: int = 5000) -> int:
+    """Move up to ``batch`` v1 rows into v2 in one short transaction; drop v1 when empty. Returns rows moved."""
+    if not has_legacy(conn):
+        return 0
+    try:
+        return _migrate_batch(conn, batch)
+    except sqlite3.OperationalError:
+        # Another process may have finished the migration and dropped v1.
+        if _legacy_exists(conn):
+            raise
+        _set_legacy(conn, False)
+        return 0
+
+
+def _migrate_batch(conn, batch: int) -> int:
+    with conn:
+        rows = conn.execute('SELECT rowid, src, tgt, hash, text FROM translations LIMIT ?', (batch,)).fetchall()
+        if not rows:
+            conn.execute('DROP TABLE translations')
+            _set_legacy(conn, False)
+            return 0
+        now = today()
+        out = []
+        for _, src, tgt, h, text in rows:
+            value, flags = encode_value(text)
+            out.append((pair_id(conn, src, tgt), bytes.fromhex(h)[:DIGEST_BYTES], value, flags, now))
+        # v2 wins over v1 on conflict: it may already hold a newer translation.
+        conn.executemany(
+            'INSERT OR IGNORE INTO translations_v2(pair, digest, value, flags, atime) VALUES (?, ?, ?, ?, ?)', out
+        )
+        conn.executemany('DELETE FROM translations WHERE rowid=?', [(r[0],) for r in rows])
+    return len(rows)
+
+
+def evict(conn, max_idle_days: int) -> int:
+    """Delete entries not read or written for ``max_idle_days``, and their translation-memory rows. Caller commits."""
+    from .memory import tm_prune  # memory builds on this module
+
+    cur = conn.execute('DELETE FROM translations_v2 WHERE atime < ?', (today() - max_idle_days,))
+    tm_prune(conn)
+    return cur.rowcount
@@ -0,0 +1,525 @@
+import os
+import json
+import time
+import uuid
+import socket
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+
+from deep_translator import GoogleTranslator
+
+from .srt_utils import normalize_google_lang, restore_tags, normalize_text_block
+from .journal import journal_key
+from .prepare import prepare_file, subs_from_prepared
+from .hedge import call_upstream
+from . import translate as _translate
+
+# Coordinator/worker mode for large backlogs.
+#
+# The coordinator splits every file into group tasks (see group_subs) and
+# puts them on a queue together with what it needs to reassemble the file.
+# Workers, on any number of hosts, lease one task at a time per slot,
+# translate it and post the result. A lease that is not completed or
+# renewed before it expires (worker crashed, host lost) goes back to the
+# queue, up to MAX_ATTEMPTS leases per task; after that the task is failed
+# and its cues keep their source text, like a failed group in
+# translate_srt_file. Once no task is pending the coordinator writes the
+# output in cue order.
+#
+# Queues are pluggable through open_queue():
+#   memory://              in-process stand-in (tests, benchmarks)
+#   sqlite:///path/to/db   shared by processes on one host, or by hosts
+#                          over a filesystem with working file locks
+# Another backend only needs the TaskQueue methods.
+#
+# A job is one (file content, languages, output path). Submitting it again
+# once it has no queued or leased task left requeues it from scratch;
+# groups translated the first time come back from the cache.
+
+QUEUE_URL = os.environ.get('TRANSLATE_QUEUE', 'sqlite:///.translate_queue.sqlite')
+LEASE_SECONDS = float(os.environ.get('TRANSLATE_LEASE_SECONDS', '120'))
+MAX_ATTEMPTS = int(os.environ.get('TRANSLATE_MAX_ATTEMPTS', '3'))
+WORKER_CONCURRENCY = int(os.environ.get('TRANSLATE_WORKER_CONCURRENCY', '6'))
+POLL_SECONDS = 0.5
+
+QUEUED, LEASED, DONE, FAILED = 'queued', 'leased', 'done', 'failed'
+
+
+class Lease:
+    def __init__(self, job_id: str, seq: int, token: str, payload: dict, attempts: int):
+        self.job_id = job_id
+        self.seq = seq
+        self.token = token
+        self.payload = payload
+        self.attempts = attempts
+
+
+class TaskQueue(ABC):
+    """Task queue plus result store shared by the coordinator and its workers.
+
+    Every method is blocking and safe to call from several threads. A
+    ``token`` identifies one lease: renew/complete/fail with a token whose
+    lease expired and was handed to another worker return False.
+    """
+
+    @abstractmethod
+    def add_job(self, job_id: str, meta: dict, payloads) -> bool:
+        """Register a job and its tasks, replacing a finished one; False while ``job_id`` has work queued or leased."""
+        ...
+
+    @abstractmethod
+    def lease(self, worker: str, seconds: float = None):
+        """Lease the next queued (or expired) task, or return None."""
+        ...
+
+    @abstractmethod
+    def renew(self, lease: Lease, seconds: float = None) -> bool:
+        ...
+
+    @abstractmethod
+    def complete(self, lease: Lease, result) -> bool:
+        ...
+
+    @abstractmethod
+    def fail(self, lease: Lease, error: str) -> bool:
+        """Give a task back after an error; it is failed for good after MAX_ATTEMPTS leases."""
+        ...
+
+    @abstractmethod
+    def job_meta(self, job_id: str):
+        ...
+
+    @abstractmethod
+    def status(self, job_id: str) -> dict:
+        """Task counts per state."""
+        ...
+
+    @abstractmethod
+    def results(self, job_id: str) -> dict:
+        """{seq: result} for finished tasks; failed tasks map to None."""
+        ...
+
+    @abstractmethod
+    def jobs(self):
+        ...
+
+
+class MemoryQueue(TaskQueue):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._tasks = {}
+        self._order = []
+
+    def add_job(self, job_id, meta, payloads):
+        with self._lock:
+            old = [key for key in self._tasks if key[0] == job_id]
+            if any(self._tasks[key]['state'] in (QUEUED, LEASED) for key in old):
+                return False
+            for key in old:
+                del self._tasks[key]
+            self._order = [key for key in self._order if key[0] != job_id]
+            self._jobs[job_id] = meta
+            for seq, payload in enumerate(payloads):
+                self._tasks[(job_id, seq)] = {
+                    'state': QUEUED, 'payload': payload, 'result': None,
+                    'attempts': 0, 'lease_until': 0.0, 'token': None, 'error': None,
+                }
+                self._order.append((job_id, seq))
+            return True
+
+    def lease(self, worker, seconds=None):
+        seconds = LEASE_SECONDS if seconds is None else seconds
+        now = time.time()
+        with self._lock:
+            for key in self._order:
+                task = self._tasks[key]
+                if task['state'] == LEASED and task['lease_until'] < now:
+                    task['state'] = QUEUED if task['attempts'] < MAX_ATTEMPTS else FAILED
+                    task['error'] = task['error'] or 'lease expired'
+                if task['state'] != QUEUED:
+                    continue
+                task.update(state=LEASED, token=uuid.uuid4().hex, lease_until=now + seconds)
+                task['attempts'] += 1
+                return Lease(key[0], key[1], task['token'], task['payload'], task['attempts'])
+            self._order = [k for k in self._order if self._tasks[k]['state'] in (QUEUED, LEASED)]
+        return None
+
+    def _owned(self, lease):
+        task = self._tasks.get((lease.job_id, lease.seq))
+        if task is None or task['state'] != LEASED or task['token'] != lease.token:
+            return None
+        return task
+
+    def renew(self, lease, seconds=None):
+        seconds = LEASE_SECONDS if seconds is None else seconds
+        with self._lock:
+            task = self._owned(lease)
+            if task is None:
+                return False
+            task['lease_until'] = time.time() + seconds
+            return True
+
+    def complete(self, lease, result):
+        with self._lock:
+            task = self._owned(lease)
+            if task is None:
+                return False
+            task.update(state=DONE, result=result, token=None)
+            return True
+
+    def fail(self, lease, error):
+        with self._lock:
+            task = self._owned(lease)
+            if task is None:
+                return False
+            task.update(state=QUEUED if task['attempts'] < MAX_ATTEMPTS else FAILED, error=error, token=None)
+            return True
+
+    def job_meta(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def status(self, job_id):
+        counts = {QUEUED: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        with self._lock:
+            for (jid, _), task in self._tasks.items():
+                if jid == job_id:
+                    counts[task['state']] += 1
+        return counts
+
+    def results(self, job_id):
+        with self._lock:
+            return {
+                seq: task['result'] if task['state'] == DONE else None
+                for (jid, seq), task in self._tasks.items()
+                if jid == job_id and task['state'] in (DONE, FAILED)
+            }
+
+    def jobs(self):
+        with self._lock:
+            return list(self._jobs)
+
+
+class SQLiteQueue(TaskQueue):
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute('PRAGMA journal_mode=WAL;')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS dist_jobs ('
+            ' id TEXT PRIMARY KEY,'
+            ' meta TEXT NOT NULL,'
+            ' created REAL NOT NULL'
+            ');'
+        )
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS dist_tasks ('
+            ' job TEXT NOT NULL,'
+            ' seq INTEGER NOT NULL,'
+            ' state TEXT NOT NULL,'
+            ' payload TEXT NOT NULL,'
+            ' result TEXT,'
+            ' attempts INTEGER NOT NULL DEFAULT 0,'
+            ' lease_until REAL NOT NULL DEFAULT 0,'
+            ' token TEXT,'
+            ' worker TEXT,'
+            ' error TEXT,'
+            ' PRIMARY KEY (job, seq)'
+            ');'
+        )
+        # Leasing must not sort the backlog under the write lock: queued tasks are taken in rowid
+        # order from dist_tasks_ready, expired leases oldest first from dist_tasks_state.
+        conn.execute('CREATE INDEX IF NOT EXISTS dist_tasks_state ON dist_tasks(state, lease_until);')
+        conn.execute('CREATE INDEX IF NOT EXISTS dist_tasks_ready ON dist_tasks(state);')
+
+    def _conn(self):
+        # One connection per thread; BEGIN IMMEDIATE serializes leasing across processes.
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA busy_timeout=30000;')
+            conn.execute('PRAGMA synchronous=NORMAL;')
+            self._local.conn = conn
+        return conn
+
+    def _write(self, fn):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            out = fn(conn)
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+        return out
+
+    def add_job(self, job_id, meta, payloads):
+        def _add(conn):
+            active = conn.execute(
+                'SELECT 1 FROM dist_tasks WHERE job=? AND state IN (?, ?) LIMIT 1', (job_id, QUEUED, LEASED)
+            ).fetchone()
+            if active:
+                return False
+            conn.execute('DELETE FROM dist_tasks WHERE job=?', (job_id,))
+            conn.execute('INSERT OR REPLACE INTO dist_jobs(id, meta, created) VALUES (?, ?, ?)',
+                         (job_id, json.dumps(meta, ensure_ascii=False), time.time()))
+            conn.executemany(
+                'INSERT INTO dist_tasks(job, seq, state, payload) VALUES (?, ?, ?, ?)',
+                [(job_id, seq, QUEUED, json.dumps(p, ensure_ascii=False)) for seq, p in enumerate(payloads)],
+            )
+            return True
+        return self._write(_add)
+
+    def lease(self, worker, seconds=None):
+        seconds = LEASE_SECONDS if seconds is None else seconds
+
+        def _lease(conn):
+            now = time.time()
+            conn.execute(
+                "UPDATE dist_tasks SET state=?, error=COALESCE(error, 'lease expired')"
+                " WHERE state=? AND lease_until<? AND attempts>=?",
+                (FAILED, LEASED, now, MAX_ATTEMPTS),
+            )
+            row = conn.execute(
+                'SELECT job, seq, payload, attempts FROM dist_tasks'
+                ' WHERE state=? AND lease_until<? ORDER BY lease_until LIMIT 1',
+                (LEASED, now),
+            ).fetchone()
+            if row is None:
+                row = conn.execute(
+                    'SELECT job, seq, payload, attempts FROM dist_tasks'
+                    ' WHERE state=? ORDER BY rowid LIMIT 1',
+                    (QUEUED,),
+                ).fetchone()
+            if row is None:
+                return None
+            job_id, seq, payload, attempts = row
+            token = uuid.uuid4().hex
+            conn.execute(
+                'UPDATE dist_tasks SET state=?, token=?, worker=?, lease_until=?, attempts=? WHERE job=? AND seq=?',
+                (LEASED, token, worker, now + seconds, attempts + 1, job_id, seq),
+            )
+            return Lease(job_id, seq, token, json.loads(payload), attempts + 1)
+        return self._write(_lease)
+
+    def renew(self, lease, seconds=None):
+        seconds = LEASE_SECONDS if seconds is None else seconds
+        return self._write(lambda conn: conn.execute(
+            'UPDATE dist_tasks SET lease_until=? WHERE job=? AND seq=? AND state=? AND token=?',
+            (time.time() + seconds, lease.job_id, lease.seq, LEASED, lease.token),
+        ).rowcount == 1)
+
+    def complete(self, lease, result):
+        return self._write(lambda conn: conn.execute(
+            'UPDATE dist_tasks SET state=?, result=?, token=NULL WHERE job=? AND seq=? AND state=? AND token=?',
+            (DONE, json.dumps(result, ensure_ascii=False), lease.job_id, lease.seq, LEASED, lease.token),
+        ).rowcount == 1)
+
+    def fail(self, lease, error):
+        return self._write(lambda conn: conn.execute(
+            'UPDATE dist_tasks SET state=CASE WHEN attempts>=? THEN ? ELSE ? END, error=?, token=NULL'
+            ' WHERE job=? AND seq=? AND state=? AND token=?',
+            (MAX_ATTEMPTS, FAILED, QUEUED, error, lease.job_id, lease.seq, LEASED, lease.token),
+        ).rowcount == 1)
+
+    def job_meta(self, job_id):
+        row = self._conn().execute('SELECT meta FROM dist_jobs WHERE id=?', (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def status(self, job_id):
+        counts = {QUEUED: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        cur = self._conn().execute('SELECT state, COUNT(*) FROM dist_tasks WHERE job=? GROUP BY state', (job_id,))
+        for state, n in cur:
+            counts[state] = n
+        return counts
+
+    def results(self, job_id):
+        cur = self._conn().execute(
+            'SELECT seq, state, result FROM dist_tasks WHERE job=? AND state IN (?, ?)', (job_id, DONE, FAILED)
+        )
+        return {seq: json.loads(result) if state == DONE else None for seq, state, result in cur}
+
+    def jobs(self):
+        return [r[0] for r in self._conn().execute('SELECT id FROM dist_jobs ORDER BY created')]
+
+
+def open_queue(url: str = None) -> TaskQueue:
+    url = url or QUEUE_URL
+    if url == 'memory://':
+        return MemoryQueue()
+    if url.startswith('sqlite:///'):
+        return SQLiteQueue(url[len('sqlite:///'):])
+    raise ValueError(f"Unsupported queue URL: {url}")
+
+
+# Coordinator
+
+def split_file(path: str, target_lang: str, source_lang: str = 'auto'):
+    """Return (job_id, meta, task payloads) for one file; job ids are stable per (content, source, target, output)."""
+    prepared = prepare_file(path)
+    tuning = prepared['tuning']
+    subs = subs_from_prepared(prepared)
+    groups = _translate.group_subs(
+        subs,
+        max_chars=int(os.environ.get('GROUP_MAX_CHARS', str(tuning['group_max_chars']))),
+        max_blocks=int(os.environ.get('GROUP_MAX_BLOCKS', str(tuning['group_max_blocks']))),
+        max_gap_ms=int(os.environ.get('GROUP_MAX_GAP_MS', str(tuning['group_max_gap_ms']))),
+    )
+    group_source = source_lang if source_lang != 'auto' else (prepared['dominant_lang'] or 'auto')
+    base, _ = os.path.splitext(os.path.abspath(path))
+    meta = {
+        'path': os.path.abspath(path),
+        'output': f"{base}_{target_lang}.srt",
+        'cues': prepared['cues'],
+        'groups': groups,
+        'placeholders': [placeholders for _, placeholders in prepared['protected']],
+    }
+    payloads = [
+        {'idx': g, 'texts': [prepared['protected'][i][0] for i in g], 'src': group_source, 'tgt': target_lang}
+        for g in groups
+    ]
+    key = journal_key(prepared['digest'], source_lang, target_lang)
+    job_id = hashlib.sha256(f"{key}\0{meta['output']}".encode('utf-8')).hexdigest()[:32]
+    return job_id, meta, payloads
+
+
+def submit_file(queue: TaskQueue, path: str, target_lang: str, source_lang: str = 'auto') -> str:
+    job_id, meta, payloads = split_file(path, target_lang, source_lang)
+    if queue.add_job(job_id, meta, payloads):
+        print(f"Submitted {path}: {len(payloads)} group tasks (job {job_id})")
+    else:
+        print(f"Already in progress: {path} (job {job_id})")
+    return job_id
+
+
+def job_finished(queue: TaskQueue, job_id: str) -> bool:
+    counts = queue.status(job_id)
+    return counts[QUEUED] == 0 and counts[LEASED] == 0
+
+
+async def wait_jobs(queue: TaskQueue, job_ids, poll: float = POLL_SECONDS):
+    pending = list(job_ids)
+    while pending:
+        pending = [j for j in pending if not await asyncio.to_thread(job_finished, queue, j)]
+        if pending:
+            await asyncio.sleep(poll)
+
+
+def assemble_job(queue: TaskQueue, job_id: str, output_srt: str = None):
+    """Write a finished job's output in cue order; returns the output path."""
+    meta = queue.job_meta(job_id)
+    if meta is None:
+        raise KeyError(job_id)
+    subs = subs_from_prepared(meta)
+    results = queue.results(job_id)
+    failed = 0
+    for seq, idx_list in enumerate(meta['groups']):
+        translated = results.get(seq)
+        if translated is None:
+            failed += len(idx_list)
+            continue
+        for i, seg in zip(idx_list, translated):
+            subs[i].text = restore_tags(seg or '', meta['placeholders'][i])
+    for sub in subs:
+        sub.text = normalize_text_block(sub.text or '')
+    output_srt = output_srt or meta['output']
+    subs.save(output_srt, encoding='utf-8')
+    if failed:
+        print(f"Saved: {output_srt} ({failed} cues left untranslated after {MAX_ATTEMPTS} attempts)")
+    else:
+        print(f"Saved: {output_srt}")
+    return output_srt
+
+
+# Worker
+
+def _upstream(text: str, src: str, tgt: str) -> str:
+    translator = GoogleTranslator(source=normalize_google_lang(src), target=normalize_google_lang(tgt))
+    return translator.translate(text)
+
+
+async def translate_group(texts, src: str, tgt: str):
+    """Translate a group of tag-protected cues; returns the protected translations in order.
+
+    Same path as a group in translate_srt_file: cache and translation
+    memory first, one combined upstream call, per-cue calls on a split
+    mismatch. Errors propagate so the task goes back to the queue.
+    """
+    out = [t if not t.strip() else None for t in texts]
+    todo = [j for j, t in enumerate(texts) if out[j] is None]
+    if _translate.DISK_CACHE_ENABLED and todo:
+        found = await asyncio.to_thread(_translate.disk_cache_get_many, src, tgt, [texts[j] for j in todo])
+        for j in todo:
+            out[j] = found.get(texts[j])
+            if out[j] is None:
+                out[j] = await asyncio.to_thread(_translate.disk_cache_fuzzy_get, src, tgt, texts[j])
+        todo = [j for j in todo if out[j] is None]
+    if not todo:
+        return out
+    combined = f"\n{_translate.GROUP_SEP}\n".join(texts[j] for j in todo)
+    parts = (await call_upstream(lambda: _upstream(combined, src, tgt), kind='group')).split(_translate.GROUP_SEP)
+    if len(parts) != len(todo):
+        parts = []
+        for j in todo:
+            parts.append(await call_upstream(lambda j=j: _upstream(texts[j], src, tgt), kind='cue'))
+    for j, seg in zip(todo, parts):
+        out[j] = seg or ''
+    await asyncio.to_thread(_translate.disk_cache_set_many, [(src, tgt, texts[j], out[j]) for j in todo])
+    return out
+
+
+async def _renew_while(queue: TaskQueue, lease: Lease, seconds: float):
+    while True:
+        await asyncio.sleep(seconds / 3)
+        if not await asyncio.to_thread(queue.renew, lease, seconds):
+            return
+
+
+async def run_worker(queue: TaskQueue, worker_id: str = None, concurrency: int = None,
+                     idle_exit: float = None, lease_seconds: float = None):
+    """Process tasks with ``concurrency`` slots until cancelled, or until idle for ``idle_exit`` seconds.
+
+    Returns the number of tasks completed.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    concurrency = max(1, concurrency or WORKER_CONCURRENCY)
+    lease_seconds = LEASE_SECONDS if lease_seconds is None else lease_seconds
+    loop = asyncio.get_running_loop()
+    state = {'done': 0, 'last_work': loop.time()}
+
+    async def slot():
+        while True:
+            lease = await asyncio.to_thread(queue.lease, worker_id, lease_seconds)
+            if lease is None:
+                if idle_exit is not None and loop.time() - state['last_work'] >= idle_exit:
+                    return
+                await asyncio.sleep(POLL_SECONDS)
+                continue
+            renewer = asyncio.create_task(_renew_while(queue, lease, lease_seconds))
+            try:
+                p = lease.payload
+                result = await translate_group(p['texts'], p['src'], p['tgt'])
+            except asyncio.CancelledError:
+                await asyncio.to_thread(queue.fail, lease, 'worker stopped')
+                raise
+            except Exception as e:
+                print(f"Task {lease.job_id}/{lease.seq} failed (attempt {lease.attempts}): {e}")
+                await asyncio.to_thread(queue.fail, lease, str(e))
+                continue
+            finally:
+                renewer.cancel()
+                state['last_work'] = loop.time()
+            if await asyncio.to_thread(queue.complete, lease, result):
+                state['done'] += 1
+
+    slots = [asyncio.create_task(slot()) for _ in range(concurrency)]
+    try:
+        await asyncio.gather(*slots)
+    finally:
+        _translate._cancel_tasks(slots)
+    return state['done']
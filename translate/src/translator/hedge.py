@@ -0,0 +1,189 @@
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from .scheduler import get_scheduler
+
+# Per-call deadlines and budgeted hedging for upstream translate calls.
+#
+# Upstream calls run in worker threads (deep-translator is synchronous), so
+# a losing or timed-out call cannot be interrupted: its result is ignored
+# and the job moves on instead of waiting on the thread. Those threads come
+# from a dedicated pool sized to the global budget plus hedge headroom, so
+# stuck calls never starve the default executor (cache reads, parsing).
+# Latency and deadlines count from when a thread picks the call up.
+#
+# deep-translator calls requests.get() without a timeout, so HTTP requests
+# made on the pool get the call's deadline as their connect/read timeout
+# and a hung connection frees its thread. Hedges, and calls abandoned past
+# the deadline, hold a slot of the global JobScheduler budget until their
+# thread returns, so they never add upstream load beyond it.
+
+CALL_TIMEOUT = float(os.environ.get('TRANSLATE_CALL_TIMEOUT', '30'))
+HEDGE_ENABLED = os.environ.get('TRANSLATE_HEDGE', '1') != '0'
+HEDGE_RATIO = float(os.environ.get('TRANSLATE_HEDGE_RATIO', '0.05'))
+HEDGE_QUANTILE = float(os.environ.get('TRANSLATE_HEDGE_QUANTILE', '0.95'))
+HEDGE_MIN_DELAY = float(os.environ.get('TRANSLATE_HEDGE_MIN_DELAY', '0.2'))
+
+HEDGE_STATS = {'calls': 0, 'hedged': 0, 'hedge_won': 0, 'timeouts': 0}
+
+
+class LatencyTracker:
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def quantile(self, q: float):
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class HedgeBudget:
+    """Token bucket: each primary call earns ``ratio`` of a hedge, so hedges stay at most ``ratio`` of volume."""
+
+    def __init__(self, ratio: float, burst: float = 5.0):
+        self.ratio = max(0.0, ratio)
+        self.burst = burst
+        self.tokens = 0.0
+
+    def on_primary(self):
+        self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def try_take(self) -> bool:
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+
+_TRACKERS = {}
+_BUDGET = HedgeBudget(HEDGE_RATIO)
+_EXECUTOR = None
+_EXECUTOR_LOCK = threading.Lock()
+_LOCAL = threading.local()
+
+
+def _install_request_timeout():
+    original = requests.Session.request
+    if getattr(original, 'upstream_timeout', False):
+        return
+
+    def request(self, method, url, *args, **kwargs):
+        timeout = getattr(_LOCAL, 'timeout', None)
+        if timeout is not None and kwargs.get('timeout') is None and len(args) < 7:
+            kwargs['timeout'] = timeout
+        return original(self, method, url, *args, **kwargs)
+
+    request.upstream_timeout = True
+    requests.Session.request = request
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            default = get_scheduler().capacity + int(_BUDGET.burst)
+            workers = int(os.environ.get('TRANSLATE_UPSTREAM_THREADS', str(default)))
+            _install_request_timeout()
+            _EXECUTOR = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='upstream')
+        return _EXECUTOR
+
+
+def _run_timed(fn, started: list, timeout: float):
+    started.append(time.monotonic())
+    _LOCAL.timeout = timeout
+    try:
+        return fn()
+    finally:
+        _LOCAL.timeout = None
+
+
+def _submit(loop, fn, timeout: float):
+    started = []
+    inner = _executor().submit(_run_timed, fn, started, timeout)
+    return asyncio.wrap_future(inner, loop=loop), started, inner
+
+
+def _hold_slot_until_done(loop, inner):
+    # The slot goes back once the thread returns, not when the caller stops waiting.
+    sched = get_scheduler()
+
+    def done(_):
+        try:
+            loop.call_soon_threadsafe(sched.return_slot)
+        except RuntimeError:
+            sched.in_flight -= 1  # loop closed; nothing is waiting on the scheduler any more
+
+    inner.add_done_callback(done)
+
+
+def _tracker(kind: str) -> LatencyTracker:
+    if kind not in _TRACKERS:
+        _TRACKERS[kind] = LatencyTracker()
+    return _TRACKERS[kind]
+
+
+async def call_upstream(fn, kind: str = 'group', deadline: float = None):
+    """Run the blocking ``fn()`` on the upstream pool under a deadline, hedging once if it runs past the p95.
+
+    The deadline counts from when a thread starts the call; waiting for a
+    free thread is bounded by the same deadline separately. Raises
+    ``TimeoutError`` past the deadline, or the last error if every attempt failed.
+    """
+    deadline = CALL_TIMEOUT if deadline is None else deadline
+    tracker = _tracker(kind)
+    loop = asyncio.get_running_loop()
+    submitted = time.monotonic()
+    HEDGE_STATS['calls'] += 1
+    _BUDGET.on_primary()
+    primary, primary_started, primary_inner = _submit(loop, fn, deadline)
+    started = {primary: primary_started}
+    pending = {primary}
+    error = None
+    try:
+        delay = tracker.quantile(HEDGE_QUANTILE) if HEDGE_ENABLED else None
+        if delay is not None and max(HEDGE_MIN_DELAY, delay) < deadline:
+            done, _ = await asyncio.wait(pending, timeout=max(HEDGE_MIN_DELAY, delay))
+            # A hedge only helps a call that is running; one still queued would queue behind it.
+            if not done and primary_started and _BUDGET.try_take() and get_scheduler().try_take_slot():
+                HEDGE_STATS['hedged'] += 1
+                remaining = max(0.1, deadline - (time.monotonic() - primary_started[0]))
+                hedge, hedge_started, hedge_inner = _submit(loop, fn, remaining)
+                _hold_slot_until_done(loop, hedge_inner)
+                started[hedge] = hedge_started
+                pending.add(hedge)
+        while pending:
+            # While still queued for a thread the clock runs from submission; once running, from the start.
+            clock = primary_started[0] if primary_started else submitted
+            remaining = deadline - (time.monotonic() - clock)
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is not primary:
+                        HEDGE_STATS['hedge_won'] += 1
+                    tracker.record(time.monotonic() - started[task][0])
+                    return task.result()
+                error = task.exception()
+        if error is not None and not pending:
+            raise error
+        HEDGE_STATS['timeouts'] += 1
+        raise TimeoutError(f"upstream call exceeded {deadline:g}s deadline")
+    finally:
+        # A primary that already started cannot be cancelled: keep it counted after its job's slot is released.
+        if primary in pending and not primary_inner.cancel():
+            get_scheduler().take_slot()
+            _hold_slot_until_done(loop, primary_inner)
+        for task in pending:
+            task.cancel()
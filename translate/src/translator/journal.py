@@ -0,0 +1,146 @@
+import os
+import json
+import hashlib
+import itertools
+
+import pysrt
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, one job per journal file as before
+    fcntl = None
+
+
+def source_digest(source_text: str) -> str:
+    return hashlib.sha256(source_text.encode('utf-8', errors='replace')).hexdigest()
+
+
+def journal_key(digest: str, source_lang: str, target_lang: str) -> str:
+    return hashlib.sha256(f"{source_lang}\0{target_lang}\0{digest}".encode('utf-8')).hexdigest()
+
+
+def _try_lock(fp) -> bool:
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(fp.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def journal_path(output_srt: str, key: str) -> str:
+    # A shared journal dir lets a retried upload (new temp dir, same content) resume.
+    journal_dir = os.environ.get('TRANSLATE_JOURNAL_DIR')
+    if journal_dir:
+        return os.path.join(journal_dir, f"{key[:32]}.journal")
+    return f"{output_srt}.journal"
+
+
+class JobJournal:
+    """Append-only record of translated cues for one (input, source, target) job.
+
+    The first line holds the job key; every later line maps cue indices to
+    their final text. A journal whose key does not match is discarded.
+    A running job holds an exclusive lock on its file; a concurrent job
+    with the same key (identical uploads sharing TRANSLATE_JOURNAL_DIR)
+    takes the next free ``<path>.<n>`` instead of truncating it.
+    """
+
+    def __init__(self, path: str, key: str):
+        self.path = path
+        self.key = key
+        self.completed = {}
+        self._fp = None
+
+    @classmethod
+    def open(cls, path: str, key: str) -> 'JobJournal':
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        for n in itertools.count():
+            candidate = path if n == 0 else f"{path}.{n}"
+            fp = open(candidate, 'a+', encoding='utf-8', errors='replace')
+            if _try_lock(fp):
+                break
+            fp.close()
+        journal = cls(candidate, key)
+        fp.seek(0)
+        journal._read(fp)
+        journal._fp = fp
+        if journal.completed:
+            # Ends a line torn by a crash mid-write, so the next record starts on its own line.
+            fp.write('\n')
+        else:
+            fp.seek(0)
+            fp.truncate()
+            journal._write({'key': key})
+        return journal
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8', errors='replace') as f:
+                self._read(f)
+        except OSError:
+            self.completed = {}
+
+    def _read(self, f):
+        try:
+            header = json.loads(f.readline() or '{}')
+            if header.get('key') != self.key:
+                return
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Line torn by a crash mid-write.
+                    continue
+                for i, text in entry.get('cues', {}).items():
+                    self.completed[int(i)] = text
+        except ValueError:
+            self.completed = {}
+
+    def _write(self, obj):
+        self._fp.write(json.dumps(obj, ensure_ascii=False) + '\n')
+        self._fp.flush()
+
+    def lookup(self, indices):
+        if all(i in self.completed for i in indices):
+            return [self.completed[i] for i in indices]
+        return None
+
+    def record(self, cues: dict):
+        if not cues:
+            return
+        self.completed.update(cues)
+        if self._fp is not None:
+            self._write({'cues': {str(i): text for i, text in cues.items()}})
+
+    def close(self, success: bool = False):
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+        if success:
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+
+def load_journal(path: str, key: str) -> JobJournal:
+    journal = JobJournal(path, key)
+    journal._load()
+    return journal
+
+
+def write_partial(subs: 'pysrt.SubRipFile', journal: JobJournal, output_path: str) -> int:
+    """Write ``subs`` with every journaled cue replaced by its translation; return how many were."""
+    done = 0
+    for i, sub in enumerate(subs):
+        if i in journal.completed:
+            sub.text = journal.completed[i]
+            done += 1
+    subs.save(output_path, encoding='utf-8')
+    return done
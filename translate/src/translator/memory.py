@@ -0,0 +1,177 @@
+import os
+import re
+import hashlib
+
+from . import cachedb
+
+# Translation memory over cached cue translations.
+#
+# The exact cache only hits on the SHA-256 of the tag-protected text. Here
+# every stored pair is also indexed by a normalized key: per line, speaker
+# dashes, edge [[Tn]] placeholders and whitespace are folded away, and the
+# trailing punctuation is reduced to its class (question, exclamation or
+# statement), so "Help us..." finds "Help us." but not "Help us?" or
+# "Help US!". Case is kept. A candidate is only served when its
+# translation can be adapted mechanically (see _transfer); otherwise the
+# caller goes upstream as before.
+#
+#   tm_keys(pair, norm, digest, source)    WITHOUT ROWID
+#
+# Rows point at translations_v2 by (pair, digest), so the translation is
+# stored once and a TM row dies with its cache entry (cachedb.evict).
+# Only the source text is kept, as the cache has just its digest. norm
+# is a 64-bit hash of the normalized key; the stored source is
+# re-normalized on lookup.
+
+TM_ENABLED = os.environ.get('TRANSLATE_TM', '1') != '0'
+TM_STATS = {'lookups': 0, 'exact_norm': 0}
+
+_TAG_RE = re.compile(r'\[\[T(\d+)\]\]')
+_LEAD_RE = re.compile(r'^(?:\s*(?:\[\[T\d+\]\]|[-–—]|♪))*\s*')
+_TRAIL_RE = re.compile(r'(?:\s*(?:\[\[T\d+\]\]|[.,!?…:;]|♪))*\s*$')
+
+
+def tm_init(conn):
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS tm_keys ('
+        ' pair INTEGER NOT NULL,'
+        ' norm INTEGER NOT NULL,'
+        ' digest BLOB NOT NULL,'
+        ' source TEXT NOT NULL,'
+        ' PRIMARY KEY (pair, norm, digest)'
+        ') WITHOUT ROWID;'
+    )
+    conn.execute('DROP TABLE IF EXISTS tm_buckets')
+    _migrate_entries(conn)
+
+
+def _migrate_entries(conn):
+    # The first layout copied every translation into tm_entries; re-key those rows on the cache digest.
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='tm_entries'").fetchone() is None:
+        return
+    for src, tgt, source in conn.execute('SELECT src, tgt, source FROM tm_entries').fetchall():
+        tm_add(conn, src, tgt, source)
+    conn.execute('DROP TABLE tm_entries')
+    conn.execute('DROP TABLE IF EXISTS tm_bands')
+    tm_prune(conn)
+
+
+def _lines(text: str):
+    return [ln for ln in (text or '').split('\n') if ln.strip()]
+
+
+def _split_line(line: str):
+    lead = _LEAD_RE.match(line).group(0)
+    rest = line[len(lead):]
+    trail = _TRAIL_RE.search(rest).group(0)
+    return lead, rest[:len(rest) - len(trail)], trail
+
+
+def _fold(core: str) -> str:
+    return re.sub(r'\s+', ' ', _TAG_RE.sub('[[T]]', core)).strip()
+
+
+def _terminal(trail: str) -> str:
+    # '?', '!', '?!' or '' for a statement ('.', '...', ',', none).
+    return ''.join(mark for mark in '?!' if mark in trail)
+
+
+def normalize_key(cleaned: str) -> str:
+    parts = [_split_line(ln) for ln in _lines(cleaned)]
+    if not any(_fold(core) for _, core, _ in parts):
+        return ''
+    return '\n'.join(f"{_fold(core)}{_terminal(trail)}" for _, core, trail in parts)
+
+
+def _decor(part: str) -> str:
+    return re.sub(r'\s+', '', _TAG_RE.sub('', part))
+
+
+def _respace(part: str, model: str, pattern: str) -> str:
+    # Keep the translation's spacing around the same edge mark (French "ça !", "- Oui").
+    gap = re.search(pattern, model)
+    m = re.search(pattern, part)
+    if gap is None or m is None or gap.group('mark') != m.group('mark'):
+        return part
+    return part[:m.start('gap')] + gap.group('gap') + part[m.end('gap'):]
+
+
+def _transfer(query: str, source: str, text: str):
+    """Adapt ``text`` (translation of ``source``) to ``query``, which has the same normalized key.
+
+    Edge decorations the translation mirrors from ``source`` are replaced by
+    the query's own, spaced the way the translation spaces them; inner
+    placeholders are renumbered by position.
+    """
+    q_lines, s_lines, t_lines = _lines(query), _lines(source), _lines(text)
+    if not (len(q_lines) == len(s_lines) == len(t_lines)):
+        return None
+    out = []
+    for ql, sl, tl in zip(q_lines, s_lines, t_lines):
+        qlead, qcore, qtrail = _split_line(ql)
+        slead, score, strail = _split_line(sl)
+        tlead, tcore, ttrail = _split_line(tl)
+        if _decor(slead) != _decor(tlead) or _decor(strail) != _decor(ttrail):
+            return None
+        tag_map = dict(zip(_TAG_RE.findall(score), _TAG_RE.findall(qcore)))
+        if any(k not in tag_map for k in _TAG_RE.findall(tcore)):
+            return None
+        tcore = _TAG_RE.sub(lambda m: f"[[T{tag_map[m.group(1)]}]]", tcore)
+        lead = _respace(qlead, tlead, r'(?P<mark>[-–—])(?P<gap>\s*)')
+        trail = _respace(qtrail, ttrail, r'(?P<gap>\s*)(?P<mark>[.,!?…:;])')
+        out.append(f"{lead}{tcore}{trail}")
+    return '\n'.join(out)
+
+
+def _hash64(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'big', signed=True)
+
+
+def tm_add(conn, src: str, tgt: str, cleaned: str):
+    """Index ``cleaned``, whose translation is stored in translations_v2. Caller commits."""
+    key = normalize_key(cleaned)
+    if not key:
+        return
+    pair = cachedb.pair_id(conn, src, tgt)
+    norm, d = _hash64(key), cachedb.digest(cleaned)
+    conn.execute('INSERT OR IGNORE INTO tm_keys(pair, norm, digest, source) VALUES (?, ?, ?, ?)', (pair, norm, d, cleaned))
+
+
+def tm_prune(conn) -> int:
+    """Drop TM rows whose cache entry is gone. Caller commits."""
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='tm_keys'").fetchone() is None:
+        return 0
+    cur = conn.execute(
+        'DELETE FROM tm_keys WHERE NOT EXISTS ('
+        ' SELECT 1 FROM translations_v2 v WHERE v.pair = tm_keys.pair AND v.digest = tm_keys.digest)'
+    )
+    return cur.rowcount
+
+
+def tm_lookup(conn, src: str, tgt: str, cleaned: str):
+    """Return a translation adapted from a near-identical stored cue, or None."""
+    key = normalize_key(cleaned)
+    if not key:
+        return None
+    pair = cachedb.pair_id(conn, src, tgt, create=False)
+    if pair is None:
+        return None
+    TM_STATS['lookups'] += 1
+    rows = conn.execute(
+        'SELECT k.source, v.value, v.flags FROM tm_keys k'
+        ' JOIN translations_v2 v ON v.pair = k.pair AND v.digest = k.digest'
+        ' WHERE k.pair=? AND k.norm=? LIMIT 5',
+        (pair, _hash64(key)),
+    ).fetchall()
+    for source, value, flags in rows:
+        if normalize_key(source) != key:
+            continue
+        adapted = _transfer(cleaned, source, cachedb.decode_value(value, flags))
+        if adapted is not None:
+            TM_STATS['exact_norm'] += 1
+            return adapted
+    return None
+
+
+def tm_served() -> int:
+    return TM_STATS['exact_norm']
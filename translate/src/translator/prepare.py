@@ -0,0 +1,74 @@
+import os
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+import pysrt
+
+from .srt_utils import read_srt_text, detect_file_language, auto_tune, protect_tags
+from .journal import source_digest
+
+CPU_POOL_ENABLED = os.environ.get('TRANSLATE_CPU_POOL', '0') == '1'
+
+
+def _ms_to_time(ms: int) -> 'pysrt.SubRipTime':
+    return pysrt.SubRipTime.from_ordinal(ms)
+
+
+def prepare_file(path: str) -> dict:
+    """CPU stage for one file: decode, parse, detect language, tune, protect tags.
+
+    Runs in a worker process when the pool is enabled, so the result only
+    holds plain tuples and strings that pickle cheaply.
+    """
+    text = read_srt_text(path)
+    subs = pysrt.from_string(text)
+    dominant_lang = detect_file_language(subs)
+    return {
+        'path': path,
+        'digest': source_digest(text),
+        'cues': [(sub.index, sub.start.ordinal, sub.end.ordinal, sub.text) for sub in subs],
+        'protected': [protect_tags(sub.text or '') for sub in subs],
+        'dominant_lang': dominant_lang,
+        'tuning': auto_tune(subs, dominant_lang),
+    }
+
+
+def _prepare_or_error(path: str) -> dict:
+    # One unreadable file must not abort the batch: report it in place of its result.
+    try:
+        return prepare_file(path)
+    except Exception as e:
+        return {'path': path, 'error': f"{type(e).__name__}: {e}"}
+
+
+def subs_from_prepared(prepared: dict) -> 'pysrt.SubRipFile':
+    items = [
+        pysrt.SubRipItem(index=index, start=_ms_to_time(start), end=_ms_to_time(end), text=text)
+        for index, start, end, text in prepared['cues']
+    ]
+    return pysrt.SubRipFile(items=items)
+
+
+def _pool_workers() -> int:
+    return max(1, int(os.environ.get('TRANSLATE_CPU_WORKERS', str(os.cpu_count() or 1))))
+
+
+async def iter_prepared(paths, use_pool: bool = None, workers: int = None):
+    """Yield prepared files as they finish, in completion order.
+
+    A file that cannot be read or parsed yields ``{'path': ..., 'error': ...}``.
+
+    With the pool enabled (TRANSLATE_CPU_POOL=1) files are prepared across
+    TRANSLATE_CPU_WORKERS processes; otherwise one at a time in a thread.
+    """
+    if use_pool is None:
+        use_pool = CPU_POOL_ENABLED
+    if not use_pool:
+        for path in paths:
+            yield await asyncio.to_thread(_prepare_or_error, path)
+        return
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(max_workers=workers or _pool_workers()) as pool:
+        futures = [loop.run_in_executor(pool, _prepare_or_error, path) for path in paths]
+        for fut in asyncio.as_completed(futures):
+            yield await fut
@@ -0,0 +1,196 @@
+import os
+import math
+import time
+import asyncio
+import itertools
+from collections import deque
+
+
+class SchedulerBusy(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__(f"too many translation jobs in flight; retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class Job:
+    """A translation job's share of the process-wide upstream budget.
+
+    Use ``async with job:`` around each upstream call, the same way a
+    per-request ``asyncio.Semaphore`` was used before.
+    """
+
+    def __init__(self, scheduler: 'JobScheduler', job_id: int, limit: int, weight: int):
+        self.scheduler = scheduler
+        self.id = job_id
+        self.limit = max(1, limit)
+        self.weight = max(1, weight)
+        self.active = 0
+        self.cancelled = False
+        self.started = time.monotonic()
+        self._credits = self.weight
+        self._waiters = deque()
+        self._load_sum = 0
+        self._load_samples = 0
+
+    def set_units(self, units: int):
+        # Small jobs get a larger round-robin quantum so they finish fast while big ones run.
+        if units <= self.scheduler.small_job_units:
+            self.weight = max(self.weight, self.scheduler.small_job_weight)
+            self._credits = self.weight
+
+    def mean_other_in_flight(self) -> float:
+        """Average number of other jobs' upstream calls in flight when this job asked for a slot."""
+        return self._load_sum / self._load_samples if self._load_samples else 0.0
+
+    def _ready(self) -> bool:
+        while self._waiters and self._waiters[0].done():
+            self._waiters.popleft()
+        return bool(self._waiters) and self.active < self.limit
+
+    async def acquire(self):
+        if self.cancelled:
+            raise asyncio.CancelledError()
+        sched = self.scheduler
+        self._load_sum += sched.in_flight - self.active
+        self._load_samples += 1
+        if sched.in_flight < sched.capacity and self.active < self.limit and not sched._has_waiters():
+            self.active += 1
+            sched.in_flight += 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        sched._dispatch()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        self.active -= 1
+        self.scheduler.in_flight -= 1
+        self.scheduler._dispatch()
+
+    def cancel(self):
+        self.cancelled = True
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.cancel()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.scheduler.close_job(self)
+        return False
+
+
+class JobScheduler:
+    """Process-wide upstream concurrency budget shared fairly between jobs.
+
+    Free slots are handed out by weighted round-robin over jobs that have
+    pending groups, so a short file is never stuck behind a long one.
+    ``open_job`` raises ``SchedulerBusy`` once ``max_jobs`` are registered.
+    """
+
+    def __init__(self, capacity: int = 16, max_jobs: int = 8, small_job_units: int = 40, small_job_weight: int = 2):
+        self.capacity = max(1, capacity)
+        self.max_jobs = max(1, max_jobs)
+        self.small_job_units = small_job_units
+        self.small_job_weight = max(1, small_job_weight)
+        self.in_flight = 0
+        self._ring = deque()
+        self._ids = itertools.count(1)
+        self._avg_job_s = None
+
+    @property
+    def jobs(self) -> int:
+        return len(self._ring)
+
+    def retry_after(self) -> int:
+        if self._avg_job_s is None:
+            return 5
+        # With every job slot taken, one frees up roughly every avg_duration / max_jobs seconds.
+        return int(max(1, min(60, math.ceil(self._avg_job_s / self.max_jobs))))
+
+    def open_job(self, limit: int, weight: int = 1) -> Job:
+        if len(self._ring) >= self.max_jobs:
+            raise SchedulerBusy(self.retry_after())
+        job = Job(self, next(self._ids), limit, weight)
+        self._ring.append(job)
+        return job
+
+    def close_job(self, job: Job):
+        job.cancel()
+        try:
+            self._ring.remove(job)
+        except ValueError:
+            return
+        took = time.monotonic() - job.started
+        self._avg_job_s = took if self._avg_job_s is None else 0.8 * self._avg_job_s + 0.2 * took
+        self._dispatch()
+
+    def try_take_slot(self) -> bool:
+        """Take a slot outside any job (a hedge) if one is free and no job is waiting for it."""
+        if self.in_flight < self.capacity and not self._has_waiters():
+            self.in_flight += 1
+            return True
+        return False
+
+    def take_slot(self):
+        """Keep counting a call its job gave up on but that is still running upstream."""
+        self.in_flight += 1
+
+    def return_slot(self):
+        self.in_flight -= 1
+        self._dispatch()
+
+    def _has_waiters(self) -> bool:
+        return any(job._ready() for job in self._ring)
+
+    def _next_ready(self):
+        for _ in range(len(self._ring)):
+            job = self._ring[0]
+            if job._ready() and job._credits > 0:
+                job._credits -= 1
+                if job._credits == 0:
+                    job._credits = job.weight
+                    self._ring.rotate(-1)
+                return job
+            job._credits = job.weight
+            self._ring.rotate(-1)
+        return None
+
+    def _dispatch(self):
+        while self.in_flight < self.capacity:
+            job = self._next_ready()
+            if job is None:
+                return
+            fut = job._waiters.popleft()
+            job.active += 1
+            self.in_flight += 1
+            fut.set_result(None)
+
+
+_SCHEDULER = None
+
+
+def get_scheduler() -> JobScheduler:
+    global _SCHEDULER
+    if _SCHEDULER is None:
+        _SCHEDULER = JobScheduler(
+            capacity=int(os.environ.get('TRANSLATE_GLOBAL_CONCURRENCY', '16')),
+            max_jobs=int(os.environ.get('TRANSLATE_MAX_JOBS', '8')),
+            small_job_units=int(os.environ.get('TRANSLATE_SMALL_JOB_UNITS', '40')),
+        )
+    return _SCHEDULER
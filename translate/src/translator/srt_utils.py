@@ -1,4 +1,6 @@
+import io
 import re
+import codecs
 from langdetect import detect
 
 _GOOGLE_LANG_MAP = {
@@ -15,6 +17,17 @@ _GOOGLE_LANG_MAP = {
 RTL_LANGS = {'ar', 'iw', 'he', 'fa', 'ur'}
 CJK_LANGS = {'zh', 'zh-cn', 'zh-tw', 'ja', 'ko'}
 
+# UTF-32 BOMs must be checked before UTF-16 ones (UTF-32 LE starts with the UTF-16 LE BOM).
+_BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+ENCODING_SAMPLE_BYTES = 64 * 1024
+_DECODE_CHUNK_BYTES = 256 * 1024
+
 
 def normalize_google_lang(code: str) -> str:
     if not code:
@@ -23,6 +36,89 @@ def normalize_google_lang(code: str) -> str:
     return _GOOGLE_LANG_MAP.get(c, c)
 
 
+# Typographic marks a Western (cp1252) subtitle uses besides accented letters.
+_CP1252_MARKS = set('\u00a0«»¿¡°·…–—‘’“”€')
+_NON_ASCII_RE = re.compile(rb'[\x80-\xff]')
+
+
+def _mostly_latin(sample: bytes) -> bool:
+    # charset_normalizer ranks cp1257/cp1250 above cp1252 on French or Spanish
+    # text, since the accents decode to letters in all of them. A Western
+    # sample decodes strictly to sparse accented letters; Hebrew, Cyrillic or
+    # Greek single-byte text decodes to nothing but "accented letters", and
+    # CJK text usually hits bytes cp1252 leaves undefined.
+    try:
+        text = sample.decode('cp1252')
+    except UnicodeDecodeError:
+        return False
+    extra = [c for c in text if ord(c) > 127]
+    letters = sum(c.isalpha() for c in text)
+    if len(extra) > 0.3 * max(1, letters):
+        return False
+    return all(c.isalpha() or c in _CP1252_MARKS for c in extra)
+
+
+def _detect_body(sample: bytes, final: bool):
+    if not _NON_ASCII_RE.search(sample):
+        # ASCII decodes the same in every candidate, so it is no evidence of UTF-8.
+        return 'utf-8' if final else None
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=final)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    if _mostly_latin(sample):
+        return 'cp1252'
+    try:
+        from charset_normalizer import from_bytes
+        best = from_bytes(sample).best()
+        if best is not None and best.encoding:
+            return best.encoding
+    except Exception:
+        pass
+    return 'cp1252'
+
+
+def detect_encoding(sample: bytes, final: bool = True):
+    """Return the codec for ``sample``, or None if it is all ASCII and ``final`` is False (more data follows)."""
+    for bom, enc in _BOMS:
+        if sample.startswith(bom):
+            return enc
+    return _detect_body(sample, final)
+
+
+def decode_srt_bytes(data: bytes, encoding: str = None) -> str:
+    return ''.join(iter_decoded_chunks(io.BytesIO(data), encoding))
+
+
+def iter_decoded_chunks(fp, encoding: str = None, sample: bytes = b''):
+    if not sample:
+        sample = fp.read(ENCODING_SAMPLE_BYTES)
+    chunk = sample
+    enc = encoding or detect_encoding(sample, final=len(sample) < ENCODING_SAMPLE_BYTES)
+    while enc is None:
+        # Pass an ASCII prefix through and detect on the first chunk that has something else.
+        yield chunk.decode('ascii')
+        chunk = fp.read(_DECODE_CHUNK_BYTES)
+        if not chunk:
+            return
+        enc = _detect_body(chunk, final=len(chunk) < _DECODE_CHUNK_BYTES)
+    decoder = codecs.getincrementaldecoder(enc)(errors='replace')
+    while chunk:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+        chunk = fp.read(_DECODE_CHUNK_BYTES)
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+def read_srt_text(path: str, encoding: str = None) -> str:
+    with open(path, 'rb') as fp:
+        return ''.join(iter_decoded_chunks(fp, encoding))
+
+
 def protect_tags(text: str):
     tags = re.findall(r'<[^>]+>', text)
     cleaned = text
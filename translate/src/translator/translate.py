@@ -1,9 +1,8 @@
 import os
 import glob
 import re
+import time
 import asyncio
-import sqlite3
-import hashlib
 import threading
 import http.server
 import socket
@@ -22,7 +21,15 @@ from .srt_utils import (
     normalize_text_block,
     detect_file_language,
     auto_tune,
+    read_srt_text,
 )
+from .scheduler import get_scheduler
+from .journal import JobJournal, journal_key, journal_path, source_digest
+from .prepare import iter_prepared, subs_from_prepared
+from . import memory
+from . import cachedb
+from .hedge import call_upstream
+from .tuner import tuned_params, record_job
 
 TRANSLATION_CACHE = {}
 
@@ -31,26 +38,20 @@ _DB_PATH = os.environ.get('TRANSLATE_CACHE_PATH', '.translate_cache.sqlite')
 _DB_CONN = None
 _DB_LOCK = threading.Lock()
 
+# Outputs are written next to the input as <base>_<target>.srt (see translate_srt_file).
+OUTPUT_SRT_RE = re.compile(r'^(?P<base>.*)_(?P<lang>[a-z]{2}(?:-[A-Za-z]{2})?)\.srt$')
 
-def _hash_text(text: str) -> str:
-    return hashlib.sha256(text.encode('utf-8', errors='ignore')).hexdigest()
+# Joins a group's cues into one upstream request; split back on the reply.
+GROUP_SEP = "<<<GSEP_d3e6p>>>"
 
 
 def _db_connect():
     global _DB_CONN
     if _DB_CONN is None:
-        conn = sqlite3.connect(_DB_PATH, check_same_thread=False)
-        conn.execute('PRAGMA journal_mode=WAL;')
-        conn.execute('PRAGMA synchronous=NORMAL;')
-        conn.execute(
-            'CREATE TABLE IF NOT EXISTS translations ('
-            ' src TEXT NOT NULL,'
-            ' tgt TEXT NOT NULL,'
-            ' hash TEXT NOT NULL,'
-            ' text TEXT NOT NULL,'
-            ' PRIMARY KEY (src, tgt, hash)'
-            ');'
-        )
+        conn = cachedb.connect(_DB_PATH, check_same_thread=False)
+        cachedb.init_schema(conn)
+        memory.tm_init(conn)
+        conn.commit()
         _DB_CONN = conn
     return _DB_CONN
 
@@ -58,35 +59,94 @@ def _db_connect():
 def disk_cache_get(src: str, tgt: str, cleaned: str):
     if not DISK_CACHE_ENABLED:
         return None
-    h = _hash_text(cleaned)
     with _DB_LOCK:
         conn = _db_connect()
-        cur = conn.execute('SELECT text FROM translations WHERE src=? AND tgt=? AND hash=?', (src, tgt, h))
-        row = cur.fetchone()
-        return row[0] if row else None
+        text = cachedb.get(conn, src, tgt, cleaned)
+        if conn.in_transaction:
+            conn.commit()
+        return text
 
 
 def disk_cache_set(src: str, tgt: str, cleaned: str, translated: str):
     if not DISK_CACHE_ENABLED:
         return
-    h = _hash_text(cleaned)
     with _DB_LOCK:
         conn = _db_connect()
-        conn.execute('INSERT OR REPLACE INTO translations(src, tgt, hash, text) VALUES (?, ?, ?, ?)', (src, tgt, h, translated))
+        cachedb.put_many(conn, [(src, tgt, cleaned, translated)])
+        memory.tm_add(conn, src, tgt, cleaned)
         conn.commit()
+        # Piggyback a small slice of the v1 -> v2 migration on writes (see cachedb.py).
+        if cachedb.has_legacy(conn):
+            cachedb.migrate_step(conn, 200)
+
+
+def disk_cache_fuzzy_get(src: str, tgt: str, cleaned: str):
+    """Translation-memory fallback for an exact-cache miss (see memory.py)."""
+    if not (DISK_CACHE_ENABLED and memory.TM_ENABLED):
+        return None
+    with _DB_LOCK:
+        conn = _db_connect()
+        return memory.tm_lookup(conn, src, tgt, cleaned)
+
+
+def disk_cache_set_many(entries) -> int:
+    """Store (src, tgt, cleaned, translated) entries in a single transaction."""
+    if not DISK_CACHE_ENABLED:
+        return 0
+    entries = list(entries)
+    if not entries:
+        return 0
+    with _DB_LOCK:
+        conn = _db_connect()
+        with conn:
+            cachedb.put_many(conn, entries)
+            for src, tgt, cleaned, _ in entries:
+                memory.tm_add(conn, src, tgt, cleaned)
+    return len(entries)
+
+
+def disk_cache_get_many(src: str, tgt: str, cleaned_list) -> dict:
+    """Return {cleaned: translated} for every entry of ``cleaned_list`` found in the disk cache."""
+    if not DISK_CACHE_ENABLED:
+        return {}
+    with _DB_LOCK:
+        conn = _db_connect()
+        found = cachedb.get_many(conn, src, tgt, cleaned_list)
+        if conn.in_transaction:
+            conn.commit()
+    return found
+
+
+def cache_coverage(subs, source_lang: str, target_lang: str) -> dict:
+    cleaned = [protect_tags(sub.text or '')[0] for sub in subs if (sub.text or '').strip()]
+    found = disk_cache_get_many(source_lang, target_lang, cleaned)
+    cached = sum(1 for c in cleaned if c in found)
+    return {
+        'cues': len(cleaned),
+        'cached': cached,
+        'fraction': cached / max(1, len(cleaned)),
+    }
 
 
 def _time_ms(t) -> int:
     return t.hours*3600000 + t.minutes*60000 + t.seconds*1000 + t.milliseconds
 
 
-def group_subs(subs: 'pysrt.SubRipFile', max_chars: int = 1200, max_blocks: int = 8, max_gap_ms: int = 2000):
+def group_subs(subs: 'pysrt.SubRipFile', max_chars: int = 1200, max_blocks: int = 8, max_gap_ms: int = 2000,
+               skip=()):
+    """Split cue indices into upstream groups; indices in ``skip`` (already done) are left out and end a group."""
     groups = []
     current = []
     current_len = 0
     last_end = None
     for i, sub in enumerate(subs):
         text = sub.text or ''
+        if i in skip:
+            if current:
+                groups.append(current)
+                current, current_len = [], 0
+            last_end = sub.end
+            continue
         if not text.strip():
             if current:
                 groups.append(current)
@@ -112,7 +172,8 @@ def group_subs(subs: 'pysrt.SubRipFile', max_chars: int = 1200, max_blocks: int
     return groups
 
 
-async def translate_text(text, source_lang, target_lang):
+async def translate_text(text, source_lang, target_lang, job=None):
+    """Translate one cue; ``job`` (see scheduler.py) gates only the upstream call, not cache hits."""
     cleaned, placeholders = protect_tags(text)
 
     cache_key = (source_lang, target_lang, cleaned)
@@ -122,13 +183,19 @@ async def translate_text(text, source_lang, target_lang):
         translated_all = None
         if DISK_CACHE_ENABLED:
             translated_all = await asyncio.to_thread(disk_cache_get, source_lang, target_lang, cleaned)
+            if translated_all is None:
+                translated_all = await asyncio.to_thread(disk_cache_fuzzy_get, source_lang, target_lang, cleaned)
         if translated_all is None:
             def _do_translate():
                 src = normalize_google_lang(source_lang)
                 tgt = normalize_google_lang(target_lang)
                 translator = GoogleTranslator(source=src, target=tgt)
                 return translator.translate(cleaned)
-            translated_all = await asyncio.to_thread(_do_translate)
+            if job is not None:
+                async with job:
+                    translated_all = await call_upstream(_do_translate, kind='cue')
+            else:
+                translated_all = await call_upstream(_do_translate, kind='cue')
             TRANSLATION_CACHE[cache_key] = translated_all
             if DISK_CACHE_ENABLED:
                 await asyncio.to_thread(disk_cache_set, source_lang, target_lang, cleaned, translated_all)
@@ -153,39 +220,61 @@ def _select_target_language():
     return 'fr'
 
 
-async def translate_srt_file():
+async def translate_srt_file(job=None, prepared=None, input_srt=None, target_lang=None, source_lang=None,
+                             group_deep=None, offer_download=None):
+    # Per-job settings are arguments so concurrent jobs in one process (the API)
+    # never share them; left as None they come from the environment, as in the CLI.
     env_input = os.environ.get('INPUT_SRT')
-    if env_input and os.path.exists(env_input):
+    if prepared is not None:
+        input_srt = prepared['path']
+    elif input_srt is not None:
+        if not os.path.exists(input_srt):
+            print(f"Error opening SRT file: {input_srt} not found")
+            return
+    elif env_input and os.path.exists(env_input):
         input_srt = env_input
     else:
         srt_files = sorted(glob.glob('*.srt'))
         if not srt_files:
             print("No SRT file found in the current folder.")
             return
-        non_out = [p for p in srt_files if not re.match(r'.*_[a-z]{2}(?:-[A-Za-z]{2})?\.srt$', p)]
+        non_out = [p for p in srt_files if not OUTPUT_SRT_RE.match(p)]
         input_srt = (non_out[0] if non_out else srt_files[0])
     print(f"Processing file: {input_srt}")
 
-    try:
-        subs = pysrt.open(input_srt, encoding='utf-8')
-    except Exception as e:
-        print(f"Error opening SRT file: {e}")
-        return
+    protected = None
+    if prepared is not None:
+        subs = subs_from_prepared(prepared)
+        digest = prepared['digest']
+        protected = prepared['protected']
+    else:
+        try:
+            source_text = read_srt_text(input_srt)
+            subs = pysrt.from_string(source_text)
+        except Exception as e:
+            print(f"Error opening SRT file: {e}")
+            return
+        digest = source_digest(source_text)
 
-    target_lang = _select_target_language()
+    target_lang = (target_lang or _select_target_language()).strip().lower()
     base, ext = os.path.splitext(input_srt)
     output_srt = f"{base}_{target_lang}.srt"
     print(f"Output file: {output_srt}")
 
-    dominant_lang = detect_file_language(subs)
-    tuning = auto_tune(subs, dominant_lang)
+    if prepared is not None:
+        dominant_lang = prepared['dominant_lang']
+        tuning = prepared['tuning']
+    else:
+        dominant_lang = detect_file_language(subs)
+        tuning = auto_tune(subs, dominant_lang)
 
     # Tunables and speed options
     fast_mode = os.environ.get('FAST_MODE', os.environ.get('SPEED_MODE', '0')) == '1'
     max_chars = int(os.environ.get('GROUP_MAX_CHARS', str(tuning['group_max_chars'])))
     max_blocks = int(os.environ.get('GROUP_MAX_BLOCKS', str(tuning['group_max_blocks'])))
     max_gap_ms = int(os.environ.get('GROUP_MAX_GAP_MS', str(tuning['group_max_gap_ms'])))
-    group_deep = os.environ.get('GROUP_DEEP', '1') != '0'
+    if group_deep is None:
+        group_deep = os.environ.get('GROUP_DEEP', '1') != '0'
     conc = int(os.environ.get('TRANSLATE_CONCURRENCY', str(tuning['group_concurrency' if group_deep else 'block_concurrency'])))
     # Fast mode prefers larger groups and moderate concurrency to reduce network overhead and throttling
     if fast_mode:
@@ -193,40 +282,111 @@ async def translate_srt_file():
         max_blocks = max(max_blocks, 12)
         max_gap_ms = max_gap_ms if max_gap_ms >= 2500 else 2500
         conc = min(conc, 6)
-    default_source = (os.environ.get('SOURCE_LANG') or 'auto').strip().lower()
-    semaphore = asyncio.Semaphore(conc)
+    default_source = (source_lang or os.environ.get('SOURCE_LANG') or 'auto').strip().lower()
+    tune_source = default_source if default_source != 'auto' else dominant_lang
+    tuned = await asyncio.to_thread(tuned_params, tune_source, target_lang) if group_deep else None
+    if tuned is not None:
+        # Recorded history beats the auto_tune / FAST_MODE constants; explicit env settings still win.
+        if 'GROUP_MAX_CHARS' not in os.environ:
+            max_chars = tuned['group_max_chars']
+        if 'GROUP_MAX_BLOCKS' not in os.environ:
+            max_blocks = tuned['group_max_blocks']
+        if 'TRANSLATE_CONCURRENCY' not in os.environ:
+            conc = tuned['group_concurrency']
+    if DISK_CACHE_ENABLED:
+        cache_source = default_source if (default_source != 'auto' or not group_deep) else dominant_lang
+        cov = await asyncio.to_thread(cache_coverage, subs, cache_source, target_lang)
+        print(f"Cache coverage: {cov['cached']}/{cov['cues']} cues ({cov['fraction']:.0%})")
+    journal = None
+    if os.environ.get('TRANSLATE_JOURNAL', '1') != '0':
+        key = journal_key(digest, default_source, target_lang)
+        journal = JobJournal.open(journal_path(output_srt, key), key)
+        if journal.completed:
+            print(f"Resuming from checkpoint: {len(journal.completed)}/{len(subs)} cues already translated")
+    started = time.monotonic()
+    try:
+        if job is None:
+            with get_scheduler().open_job(limit=conc) as own_job:
+                stats = await _run_translation(subs, own_job, journal, output_srt, target_lang, default_source,
+                                               dominant_lang, group_deep, max_chars, max_blocks, max_gap_ms,
+                                               protected)
+        else:
+            job.limit = max(1, conc)
+            stats = await _run_translation(subs, job, journal, output_srt, target_lang, default_source,
+                                           dominant_lang, group_deep, max_chars, max_blocks, max_gap_ms, protected)
+    finally:
+        if journal is not None:
+            journal.close()
+    if stats is None:
+        return
+    if group_deep:
+        params = {'group_max_chars': max_chars, 'group_max_blocks': max_blocks, 'group_concurrency': conc}
+        try:
+            await asyncio.to_thread(record_job, tune_source, target_lang, params, stats, time.monotonic() - started)
+        except Exception as e:
+            print(f"Telemetry not recorded: {e}")
 
+    await _maybe_offer_download(output_srt, offer_download)
+
+
+async def _run_translation(subs, job, journal, output_srt, target_lang, default_source, dominant_lang,
+                           group_deep, max_chars, max_blocks, max_gap_ms, protected=None):
+
+    tm_served_before = memory.tm_served()
+    stats = {'cues': len(subs), 'upstream_cues': 0, 'group_calls': 0, 'mismatches': 0, 'throttled': 0}
     progress_bar = tqdm(total=len(subs), desc="Translating subtitles", unit="cue")
     if not group_deep:
         async def process_one(i, sub):
             if not sub.text.strip():
                 progress_bar.update(1)
                 return i, sub.text
-            async with semaphore:
-                try:
-                    tt = await translate_text(sub.text, default_source, target_lang)
-                except Exception as e:
-                    print(f"Error at cue {i}: {e}")
-                    tt = sub.text
+            done = journal.lookup([i]) if journal is not None else None
+            if done is not None:
+                progress_bar.update(1)
+                return i, done[0]
+            try:
+                tt = await translate_text(sub.text, default_source, target_lang, job=job)
+            except Exception as e:
+                print(f"Error at cue {i}: {e}")
+                progress_bar.update(1)
+                return i, sub.text
+            if journal is not None:
+                journal.record({i: tt})
             progress_bar.update(1)
             return i, tt
 
+        job.set_units(len(subs))
         tasks = [asyncio.create_task(process_one(i, sub)) for i, sub in enumerate(subs)]
-        for coro in asyncio.as_completed(tasks):
-            i, tt = await coro
-            subs[i].text = tt
+        try:
+            for coro in asyncio.as_completed(tasks):
+                i, tt = await coro
+                subs[i].text = tt
+        except asyncio.CancelledError:
+            _cancel_tasks(tasks)
+            raise
     else:
         cache_group_threshold = float(os.environ.get('CACHE_GROUP_THRESHOLD', '0.6'))
         use_dominant_for_group = os.environ.get('USE_DOMINANT_FOR_GROUP', '1') != '0'
         allow_group_auto = os.environ.get('ALLOW_GROUP_AUTO', '1') != '0'
-        groups = group_subs(subs, max_chars=max_chars, max_blocks=max_blocks, max_gap_ms=max_gap_ms)
-        SEP = "<<<GSEP_d3e6p>>>"
-
-        async def process_group(idx_list):
+        # Journaled cues are filled in one by one, so a resume that groups differently (other tuning,
+        # TUNE_EXPLORE) never sends them upstream again; only the missing cues are grouped.
+        journaled = {}
+        if journal is not None:
+            journaled = {i: text for i, text in journal.completed.items() if 0 <= i < len(subs)}
+            for i, text in journaled.items():
+                subs[i].text = text
+            progress_bar.update(len(journaled))
+        groups = group_subs(subs, max_chars=max_chars, max_blocks=max_blocks, max_gap_ms=max_gap_ms, skip=journaled)
+        SEP = GROUP_SEP
+
+        async def process_group(idx_list, failed):
             per_placeholders = []
             cleaned_blocks = []
             for i in idx_list:
-                cleaned_i, placeholders_i = protect_tags(subs[i].text or '')
+                if protected is not None:
+                    cleaned_i, placeholders_i = protected[i]
+                else:
+                    cleaned_i, placeholders_i = protect_tags(subs[i].text or '')
                 per_placeholders.append(placeholders_i)
                 cleaned_blocks.append(cleaned_i)
 
@@ -250,6 +410,8 @@ async def translate_srt_file():
             if DISK_CACHE_ENABLED:
                 for j, cleaned in enumerate(cleaned_blocks):
                     cached_results[j] = await asyncio.to_thread(disk_cache_get, group_source, target_lang, cleaned)
+                    if cached_results[j] is None and cleaned.strip():
+                        cached_results[j] = await asyncio.to_thread(disk_cache_fuzzy_get, group_source, target_lang, cleaned)
             have_cached = sum(1 for x in cached_results if x is not None)
             if have_cached == len(idx_list):
                 for (i, placeholders_i, cached_text) in zip(idx_list, per_placeholders, cached_results):
@@ -265,9 +427,10 @@ async def translate_srt_file():
                         progress_bar.update(1)
                         continue
                     try:
-                        tt = await translate_text(subs[i].text or '', group_source, target_lang)
+                        tt = await translate_text(subs[i].text or '', group_source, target_lang, job=job)
                     except Exception:
                         tt = subs[i].text
+                        failed.add(i)
                     subs[i].text = tt
                     progress_bar.update(1)
                 return
@@ -275,41 +438,49 @@ async def translate_srt_file():
             if group_source == 'auto' and default_source == 'auto' and not allow_group_auto:
                 for i in idx_list:
                     try:
-                        tt = await translate_text(subs[i].text or '', 'auto', target_lang)
+                        tt = await translate_text(subs[i].text or '', 'auto', target_lang, job=job)
                     except Exception:
                         tt = subs[i].text
+                        failed.add(i)
                     subs[i].text = tt
                     progress_bar.update(1)
                 return
 
             combined = f"\n{SEP}\n".join(cleaned_blocks)
-            async with semaphore:
+            stats['group_calls'] += 1
+            stats['upstream_cues'] += len(idx_list)
+            async with job:
                 try:
                     def _do_translate_combined():
                         src = normalize_google_lang(group_source)
                         tgt = normalize_google_lang(target_lang)
                         translator = GoogleTranslator(source=src, target=tgt)
                         return translator.translate(combined)
-                    translated_combined = await asyncio.to_thread(_do_translate_combined)
+                    translated_combined = await call_upstream(_do_translate_combined, kind='group')
                 except Exception as e:
                     print(f"Group translation error {idx_list[0]}-{idx_list[-1]}: {e}")
+                    if _is_throttled(e):
+                        stats['throttled'] += 1
                     translated_combined = None
             if translated_combined is None:
                 for i in idx_list:
                     try:
-                        tt = await translate_text(subs[i].text or '', group_source, target_lang)
+                        tt = await translate_text(subs[i].text or '', group_source, target_lang, job=job)
                     except Exception:
                         tt = subs[i].text
+                        failed.add(i)
                     subs[i].text = tt
                     progress_bar.update(1)
                 return
             parts = translated_combined.split(SEP)
             if len(parts) != len(idx_list):
+                stats['mismatches'] += 1
                 for i in idx_list:
                     try:
-                        tt = await translate_text(subs[i].text or '', group_source, target_lang)
+                        tt = await translate_text(subs[i].text or '', group_source, target_lang, job=job)
                     except Exception:
                         tt = subs[i].text
+                        failed.add(i)
                     subs[i].text = tt
                     progress_bar.update(1)
                 return
@@ -320,11 +491,27 @@ async def translate_srt_file():
                     await asyncio.to_thread(disk_cache_set, group_source, target_lang, cleaned, seg or '')
                 progress_bar.update(1)
 
-        tasks = [asyncio.create_task(process_group(g)) for g in groups]
-        for coro in asyncio.as_completed(tasks):
-            await coro
+        async def process_group_checkpointed(idx_list):
+            failed = set()
+            await process_group(idx_list, failed)
+            if journal is not None:
+                journal.record({i: subs[i].text for i in idx_list if i not in failed})
+
+        job.set_units(len(groups))
+        tasks = [asyncio.create_task(process_group_checkpointed(g)) for g in groups]
+        try:
+            for coro in asyncio.as_completed(tasks):
+                await coro
+        except asyncio.CancelledError:
+            _cancel_tasks(tasks)
+            raise
 
     progress_bar.close()
+    stats['other_in_flight'] = job.mean_other_in_flight()
+    stats['capacity'] = job.scheduler.capacity
+    tm_saved = memory.tm_served() - tm_served_before
+    if tm_saved:
+        print(f"Translation memory: {tm_saved} cues served from near matches (upstream calls saved)")
 
     for sub in subs:
         sub.text = normalize_text_block(sub.text or '')
@@ -332,11 +519,51 @@ async def translate_srt_file():
     try:
         subs.save(output_srt, encoding='utf-8')
         print(f"Saved: {output_srt}")
+        if journal is not None:
+            journal.close(success=True)
     except Exception as e:
         print(f"Error when saving the SRT file: {e}")
-        return
+        return None
+    return stats
+
+
+def _is_throttled(exc: Exception) -> bool:
+    return type(exc).__name__ == 'TooManyRequests' or '429' in str(exc)
+
+async def translate_srt_batch(paths):
+    """Translate several files: the CPU stage (see prepare.py) feeds the network stage as files become ready."""
+    target_lang = _select_target_language()
+    file_slots = asyncio.Semaphore(get_scheduler().max_jobs)
+
+    async def run_one(prepared):
+        try:
+            # No interactive download prompt per file in batch mode.
+            await translate_srt_file(prepared=prepared, target_lang=target_lang, offer_download=False)
+        finally:
+            file_slots.release()
+
+    running = []
+    try:
+        async for prepared in iter_prepared(paths):
+            if 'error' in prepared:
+                print(f"Error opening SRT file {prepared['path']}: {prepared['error']}")
+                continue
+            await file_slots.acquire()
+            running.append(asyncio.create_task(run_one(prepared), name=prepared['path']))
+        results = await asyncio.gather(*running, return_exceptions=True)
+    except asyncio.CancelledError:
+        _cancel_tasks(running)
+        raise
+    for task, result in zip(running, results):
+        if isinstance(result, Exception):
+            print(f"Translation failed for {task.get_name()}: {result}")
+
+
+def _cancel_tasks(tasks):
+    for task in tasks:
+        if not task.done():
+            task.cancel()
 
-    await _maybe_offer_download(output_srt)
 
 def _serve_file_once(file_path: str):
     target = os.path.abspath(file_path)
@@ -378,8 +605,9 @@ def _serve_file_once(file_path: str):
     httpd.serve_forever()
 
 
-async def _maybe_offer_download(file_path: str):
-    offer = os.environ.get('OFFER_DOWNLOAD', '1') != '0'
+async def _maybe_offer_download(file_path: str, offer: bool = None):
+    if offer is None:
+        offer = os.environ.get('OFFER_DOWNLOAD', '1') != '0'
     auto = os.environ.get('AUTO_DOWNLOAD', '0') == '1'
     if not offer:
         return
@@ -0,0 +1,218 @@
+import os
+import time
+import random
+import sqlite3
+import threading
+
+from .srt_utils import normalize_google_lang
+
+# Job telemetry and a history-driven replacement for auto_tune's fixed constants.
+#
+# Every grouped job records its language pair, the parameters it ran with
+# and how it went. For a new job the tuner picks the parameters with the
+# lowest observed cost for that pair:
+#
+#     cost = seconds per upstream cue * (1 + MISMATCH_PENALTY * mismatch rate)
+#                                     * (1 + THROTTLE_PENALTY * throttle rate)
+#
+# Jobs share the scheduler's global slots, so a job's wall time also
+# reflects everyone else's load. Each row records the mean number of
+# other jobs' calls in flight; seconds are scaled by the share of its
+# wanted slots, min(concurrency, capacity), it could actually get, so a
+# concurrency setting is not judged by how busy the server was.
+#
+# With too little history it returns None and the caller keeps the
+# auto_tune heuristics. A small share of jobs tries a neighbouring config
+# so the history does not freeze on the first winner.
+
+TELEMETRY_ENABLED = os.environ.get('TRANSLATE_TELEMETRY', '1') != '0'
+AUTOTUNE_ENABLED = os.environ.get('TRANSLATE_AUTOTUNE', '1') != '0'
+_DB_PATH = os.environ.get('TRANSLATE_TELEMETRY_PATH', '.translate_telemetry.sqlite')
+_DB_CONN = None
+_DB_LOCK = threading.Lock()
+
+EXPLORE_RATE = float(os.environ.get('TUNE_EXPLORE', '0.1'))
+MIN_SAMPLES = 3
+MIN_UPSTREAM_CUES = 20
+HISTORY_LIMIT = 500
+MISMATCH_PENALTY = 2.0
+THROTTLE_PENALTY = 4.0
+
+
+def _db_connect():
+    global _DB_CONN
+    if _DB_CONN is None:
+        conn = sqlite3.connect(_DB_PATH, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL;')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            ' id INTEGER PRIMARY KEY,'
+            ' ts REAL NOT NULL,'
+            ' src TEXT NOT NULL,'
+            ' tgt TEXT NOT NULL,'
+            ' cues INTEGER NOT NULL,'
+            ' upstream_cues INTEGER NOT NULL,'
+            ' group_chars INTEGER NOT NULL,'
+            ' group_blocks INTEGER NOT NULL,'
+            ' concurrency INTEGER NOT NULL,'
+            ' seconds REAL NOT NULL,'
+            ' group_calls INTEGER NOT NULL,'
+            ' mismatches INTEGER NOT NULL,'
+            ' throttled INTEGER NOT NULL,'
+            ' other_in_flight REAL NOT NULL DEFAULT 0,'
+            ' capacity INTEGER NOT NULL DEFAULT 0'
+            ');'
+        )
+        cols = {r[1] for r in conn.execute('PRAGMA table_info(jobs)')}
+        # Rows recorded before load tracking keep capacity 0 and are not rescaled.
+        if 'other_in_flight' not in cols:
+            conn.execute('ALTER TABLE jobs ADD COLUMN other_in_flight REAL NOT NULL DEFAULT 0')
+        if 'capacity' not in cols:
+            conn.execute('ALTER TABLE jobs ADD COLUMN capacity INTEGER NOT NULL DEFAULT 0')
+        conn.execute('CREATE INDEX IF NOT EXISTS jobs_pair ON jobs(src, tgt, ts);')
+        conn.commit()
+        _DB_CONN = conn
+    return _DB_CONN
+
+
+def _pair(src: str, tgt: str):
+    return normalize_google_lang(src), normalize_google_lang(tgt)
+
+
+def record_job(src: str, tgt: str, params: dict, stats: dict, seconds: float):
+    if not TELEMETRY_ENABLED:
+        return
+    src, tgt = _pair(src, tgt)
+    row = (
+        time.time(), src, tgt, stats['cues'], stats['upstream_cues'],
+        params['group_max_chars'], params['group_max_blocks'], params['group_concurrency'],
+        seconds, stats['group_calls'], stats['mismatches'], stats['throttled'],
+        stats.get('other_in_flight', 0.0), stats.get('capacity', 0),
+    )
+    with _DB_LOCK:
+        conn = _db_connect()
+        conn.execute(
+            'INSERT INTO jobs(ts, src, tgt, cues, upstream_cues, group_chars, group_blocks, concurrency,'
+            ' seconds, group_calls, mismatches, throttled, other_in_flight, capacity)'
+            ' VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            row,
+        )
+        conn.commit()
+
+
+def load_history(src: str = None, tgt: str = None, limit: int = HISTORY_LIMIT):
+    """Recorded jobs as dicts, oldest first; all pairs when ``src``/``tgt`` are None."""
+    query = 'SELECT * FROM jobs'
+    args = ()
+    if src is not None and tgt is not None:
+        query += ' WHERE src=? AND tgt=?'
+        args = _pair(src, tgt)
+    query += ' ORDER BY ts DESC LIMIT ?'
+    with _DB_LOCK:
+        conn = _db_connect()
+        cur = conn.execute(query, (*args, limit))
+        cols = [c[0] for c in cur.description]
+        rows = [dict(zip(cols, r)) for r in cur.fetchall()]
+    rows.reverse()
+    return rows
+
+
+def config_of(row: dict):
+    # Bucket chars so near-identical settings pool their samples.
+    return (int(round(row['group_chars'] / 200.0)) * 200, row['group_blocks'], row['concurrency'])
+
+
+def job_cost(row: dict):
+    if row['upstream_cues'] < MIN_UPSTREAM_CUES:
+        return None
+    calls = max(1, row['group_calls'])
+    seconds = row['seconds']
+    capacity = row.get('capacity') or 0
+    if capacity and row['concurrency'] > 0:
+        wanted = min(row['concurrency'], capacity)
+        usable = max(1.0, min(wanted, capacity - row.get('other_in_flight', 0.0)))
+        seconds *= usable / wanted
+    per_cue = seconds / row['upstream_cues']
+    return per_cue * (1 + MISMATCH_PENALTY * row['mismatches'] / calls) * (1 + THROTTLE_PENALTY * row['throttled'] / calls)
+
+
+def _add_cost(sums: dict, row: dict):
+    cost = job_cost(row)
+    if cost is not None:
+        n, total = sums.get(config_of(row), (0, 0.0))
+        sums[config_of(row)] = (n + 1, total + cost)
+
+
+def config_costs(history):
+    sums = {}
+    for row in history:
+        _add_cost(sums, row)
+    return {cfg: (n, total / n) for cfg, (n, total) in sums.items()}
+
+
+def _neighbour(cfg, rng):
+    chars, blocks, conc = cfg
+    choice = rng.randrange(3)
+    if choice == 0:
+        chars = max(800, min(3000, chars + rng.choice((-200, 200))))
+    elif choice == 1:
+        blocks = max(4, min(16, blocks + rng.choice((-2, 2))))
+    else:
+        conc = max(2, min(16, conc + rng.choice((-1, 1))))
+    return chars, blocks, conc
+
+
+def suggest(history, explore: float = EXPLORE_RATE, rng=random):
+    """Pick (group_max_chars, group_max_blocks, group_concurrency) from ``history``, or None."""
+    sums = {}
+    for row in history:
+        _add_cost(sums, row)
+    return _suggest_from_sums(sums, explore, rng)
+
+
+def _suggest_from_sums(sums: dict, explore: float, rng):
+    costs = {cfg: total / n for cfg, (n, total) in sums.items() if n >= MIN_SAMPLES}
+    if not costs:
+        return None
+    best = min(costs, key=costs.get)
+    if explore and rng.random() < explore:
+        best = _neighbour(best, rng)
+    chars, blocks, conc = best
+    return {'group_max_chars': chars, 'group_max_blocks': blocks, 'group_concurrency': conc}
+
+
+def tuned_params(src: str, tgt: str):
+    if not AUTOTUNE_ENABLED:
+        return None
+    try:
+        return suggest(load_history(src, tgt))
+    except sqlite3.Error:
+        return None
+
+
+def replay(history, policy: str = 'tuner', warmup: int = 10, seed: int = 0):
+    """Offline evaluation: walk the history in order and let ``policy`` choose each job's config from the past only.
+
+    A choice is scored with the mean cost that config got over the whole
+    history. Returns the mean score and how many jobs could be scored.
+    ``policy`` is 'tuner', 'recorded' (what actually ran) or 'best' (hindsight bound).
+    """
+    rng = random.Random(seed)
+    overall = {cfg: c[1] for cfg, c in config_costs(history).items()}
+    best = min(overall, key=overall.get) if overall else None
+    scores = []
+    seen = {}
+    for k, row in enumerate(history):
+        if k >= warmup and job_cost(row) is not None:
+            cfg = config_of(row)
+            if policy == 'best':
+                cfg = best
+            elif policy == 'tuner':
+                # Running per-config sums over history[:k]: same picks as suggest(history[:k]), in linear time.
+                pick = _suggest_from_sums(seen, 0.0, rng)
+                if pick is not None:
+                    cfg = (pick['group_max_chars'], pick['group_max_blocks'], pick['group_concurrency'])
+            if cfg in overall:
+                scores.append(overall[cfg])
+        _add_cost(seen, row)
+    return {'policy': policy, 'jobs': len(scores), 'mean_cost': sum(scores) / len(scores) if scores else None}
@@ -0,0 +1,64 @@
+import os
+import glob
+
+import pysrt
+
+from .srt_utils import protect_tags, detect_file_language, read_srt_text
+from .translate import OUTPUT_SRT_RE, disk_cache_set_many, _time_ms
+
+
+def load_subs(path: str) -> 'pysrt.SubRipFile':
+    return pysrt.from_string(read_srt_text(path))
+
+
+def find_translation_pairs(paths):
+    """Return (source_path, output_path, target_lang) for every ``<base>_<lang>.srt`` whose ``<base>.srt`` exists."""
+    files = []
+    for p in paths:
+        if os.path.isdir(p):
+            files.extend(sorted(glob.glob(os.path.join(p, '*.srt'))))
+        else:
+            files.append(p)
+    pairs = []
+    for out_path in files:
+        m = OUTPUT_SRT_RE.match(out_path)
+        if not m:
+            continue
+        src_path = f"{m.group('base')}.srt"
+        if os.path.exists(src_path):
+            pairs.append((src_path, out_path, m.group('lang').lower()))
+    return pairs
+
+
+def align_cue_pairs(src_subs, out_subs):
+    """Pair source and translated cues that share a start timecode; translation never moves timings."""
+    by_start = {}
+    for sub in out_subs:
+        by_start.setdefault(_time_ms(sub.start), sub)
+    aligned = []
+    for sub in src_subs:
+        src_text = sub.text or ''
+        other = by_start.get(_time_ms(sub.start))
+        if other is None or not src_text.strip() or not (other.text or '').strip():
+            continue
+        cleaned, _ = protect_tags(src_text)
+        translated, _ = protect_tags(other.text)
+        aligned.append((cleaned, translated))
+    return aligned
+
+
+def warm_cache(paths, source_lang: str = None) -> dict:
+    entries = []
+    files = 0
+    skipped = 0
+    for src_path, out_path, target_lang in find_translation_pairs(paths):
+        src_subs = load_subs(src_path)
+        out_subs = load_subs(out_path)
+        src = (source_lang or detect_file_language(src_subs)).lower()
+        aligned = align_cue_pairs(src_subs, out_subs)
+        skipped += sum(1 for sub in src_subs if (sub.text or '').strip()) - len(aligned)
+        entries.extend((src, target_lang, cleaned, translated) for cleaned, translated in aligned)
+        files += 1
+    stored = disk_cache_set_many(entries)
+    return {'files': files, 'cues': stored, 'skipped': skipped}
+